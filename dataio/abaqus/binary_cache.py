@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+from typing import TypedDict
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+from .keyword_index import keyword_index
+from .mesh import Connectivity, ElementTable, NodeTable
+from .sets import SetMembers
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".cache"
+
+
+class set_layout(TypedDict):
+    ranges: list[str]  # Names of generate sets, stored as (start, stop, step) rows
+    explicit: list[str]  # Names of explicit sets, stored as sorted members
+
+
+class cache_manifest(TypedDict):
+    version: int
+    hash: str  # Hash of the logical keyword index
+    files: dict[str, list[int]]  # Physical file -> [size, mtime_ns]
+    element_types: list[str]
+    sets: dict[str, set_layout]
+
+
+class mesh_data(TypedDict):
+    index: keyword_index
+    nodes: NodeTable | None
+    connectivity: Connectivity | None
+    sets: dict[tuple[str, str], SetMembers]
+
+
+def cache_path(file_path: str) -> str:
+    return f"{file_path}{CACHE_SUFFIX}"
+
+
+def file_stats(index: keyword_index, file_path: str) -> dict[str, list[int]]:
+    paths = {file_path} | {entry["file"] for entry in index["entries"]}
+    stats: dict[str, list[int]] = {}
+    for path in sorted(paths):
+        stat = os.stat(path)
+        stats[path] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def concatenate_parts(
+    parts: list[npt.NDArray[np.int64]], width: int | None = None
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Concatenate arrays and return the offsets to split them again"""
+    empty = np.empty((0, width) if width else 0, np.int64)
+    offsets = np.cumsum([0] + [len(part) for part in parts], dtype=np.int64)
+    return np.concatenate(parts or [empty]).astype(np.int64), offsets
+
+
+def save_mesh_cache(file_path: str, data: mesh_data) -> None:
+    """Write the parsed model as uncompressed .npy files in the <file>.cache directory
+
+    Args:
+        file_path (str): path of the main input file
+        data (mesh_data): keyword index, nodes, connectivity and sets to store
+    """
+    directory = cache_path(file_path)
+    temporary = f"{directory}.tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.mkdir(temporary)
+
+    def save(name: str, array: npt.NDArray) -> None:
+        np.save(os.path.join(temporary, f"{name}.npy"), array)
+
+    if data["nodes"] is not None:
+        save("node_ids", data["nodes"].ids)
+        save("node_coordinates", data["nodes"].coordinates)
+
+    element_types: list[str] = []
+    if data["connectivity"] is not None:
+        for code, table in enumerate(data["connectivity"].tables.values()):
+            element_types.append(table.element_type)
+            save(f"element_{code}_ids", table.ids)
+            save(f"element_{code}_connectivity", table.connectivity)
+
+    layouts: dict[str, set_layout] = {}
+    for kind in ("Elset", "Nset"):
+        members = {
+            name: set_members
+            for (set_kind, name), set_members in data["sets"].items()
+            if set_kind == kind
+        }
+        range_names = [name for name, s in members.items() if s.ranges is not None]
+        explicit_names = [name for name, s in members.items() if s.ranges is None]
+        ranges, range_offsets = concatenate_parts(
+            [members[name].ranges for name in range_names], width=3  # type: ignore
+        )
+        explicit, explicit_offsets = concatenate_parts(
+            [members[name].to_array() for name in explicit_names]
+        )
+        save(f"{kind}_ranges", ranges)
+        save(f"{kind}_range_offsets", range_offsets)
+        save(f"{kind}_members", explicit)
+        save(f"{kind}_member_offsets", explicit_offsets)
+        layouts[kind] = {"ranges": range_names, "explicit": explicit_names}
+
+    with open(os.path.join(temporary, "keyword_index.json"), "w") as file:
+        json.dump(data["index"], file)
+
+    manifest: cache_manifest = {
+        "version": CACHE_VERSION,
+        "hash": data["index"]["signature"]["hash"],
+        "files": file_stats(data["index"], file_path),
+        "element_types": element_types,
+        "sets": layouts,
+    }
+    # The manifest is written last, so an interrupted write leaves no valid cache
+    with open(os.path.join(temporary, "manifest.json"), "w") as file:
+        json.dump(manifest, file)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.rename(temporary, directory)
+    logger.info(f"Wrote binary mesh cache to {directory}")
+
+
+def load_manifest(file_path: str) -> cache_manifest | None:
+    try:
+        with open(os.path.join(cache_path(file_path), "manifest.json"), "r") as file:
+            manifest: cache_manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def is_unchanged(manifest: cache_manifest) -> bool:
+    """True when every physical file still has the size and mtime stored in the cache"""
+    for path, (size, mtime_ns) in manifest["files"].items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+            return False
+    return True
+
+
+def load_mesh_cache(file_path: str, manifest: cache_manifest) -> mesh_data:
+    """Memory map the arrays of the binary cache
+
+    Args:
+        file_path (str): path of the main input file
+        manifest (cache_manifest): manifest of the cache, see load_manifest
+
+    Returns:
+        mesh_data: index, nodes, connectivity and sets backed by the cache files
+    """
+    directory = cache_path(file_path)
+
+    def load(name: str) -> npt.NDArray:
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+    with open(os.path.join(directory, "keyword_index.json"), "r") as file:
+        index: keyword_index = json.load(file)
+
+    nodes = None
+    if os.path.exists(os.path.join(directory, "node_ids.npy")):
+        nodes = NodeTable(load("node_ids"), load("node_coordinates"))
+
+    connectivity = None
+    if manifest["element_types"]:
+        connectivity = Connectivity(
+            {
+                element_type: ElementTable(
+                    element_type,
+                    load(f"element_{code}_ids"),
+                    load(f"element_{code}_connectivity"),
+                )
+                for code, element_type in enumerate(manifest["element_types"])
+            }
+        )
+
+    sets: dict[tuple[str, str], SetMembers] = {}
+    for kind, layout in manifest["sets"].items():
+        ranges, range_offsets = load(f"{kind}_ranges"), load(f"{kind}_range_offsets")
+        for position, name in enumerate(layout["ranges"]):
+            start, stop = range_offsets[position], range_offsets[position + 1]
+            sets[(kind, name)] = SetMembers(name, ranges=np.array(ranges[start:stop]))
+
+        members, offsets = load(f"{kind}_members"), load(f"{kind}_member_offsets")
+        for position, name in enumerate(layout["explicit"]):
+            start, stop = offsets[position], offsets[position + 1]
+            sets[(kind, name)] = SetMembers(name, members=members[start:stop])
+
+    return {"index": index, "nodes": nodes, "connectivity": connectivity, "sets": sets}
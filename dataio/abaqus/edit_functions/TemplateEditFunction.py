@@ -1,9 +1,21 @@
 from abc import abstractmethod
+from typing import Iterable
+
+# Number of lines to skip that drops every data line up to the next keyword line,
+# for blocks whose length is not known from the keyword line
+SKIP_BLOCK = -1
 
 
 class TemplateEditFunction:
     """Template class that the edit_line function in write_abaqus_input_file module accepts"""
 
+    # Keywords the function edits, e.g. ("Solid Section",). modify_file only calls
+    # check_line on keyword lines with one of these keywords. If empty, check_line is
+    # called on every line that contains "*".
+    keywords: tuple[str, ...] = ()
+    # Names (name, elset or nset parameter) the function edits, any name if empty
+    names: tuple[str, ...] = ()
+
     def __init__(self) -> None:
         pass
 
@@ -36,6 +48,31 @@ class TemplateEditFunction:
 
         Returns:
             list[str]: list of lines to be added
-            int: number of lines to skip after the current line
+            int: number of lines to skip after the current line, or SKIP_BLOCK
         """
         pass
+
+    def stream_line(self, lines: list[str]) -> tuple[Iterable[str], int]:
+        """Streaming variant of process_line. Functions that write many lines can
+        override it to yield them, so they are written as they are produced instead
+        of being held in memory. Defaults to the list returned by process_line.
+
+        Args:
+            line (str): line from file
+
+        Returns:
+            Iterable[str]: lines to be added, e.g. a generator
+            int: number of lines to skip after the current line
+        """
+        return self.process_line(lines)
+
+    def config(self) -> dict[str, object]:
+        """Class and parameters of the function, used to tell whether an output written
+        with it is still current. Call it before the function is used, as some
+        functions keep state while a file is written.
+
+        Returns:
+            dict[str, object]: qualified class name and the instance attributes
+        """
+        cls = type(self)
+        return {"class": f"{cls.__module__}.{cls.__qualname__}", "params": vars(self)}
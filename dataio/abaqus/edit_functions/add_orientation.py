@@ -1,18 +1,74 @@
-from typing import Literal, LiteralString
+from typing import Iterator, Literal, LiteralString
 from .TemplateEditFunction import TemplateEditFunction as Template
 import numpy as np
 import numpy.typing as npt
+from loguru import logger
 from math_util import vector_transformation as vt
 
+# Fibers formatted into one string by orientation_lines
+FORMAT_BATCH = 1024
+
+# "sections" writes one *Orientation and *Solid Section per fiber, "distribution" one
+# element wise *Distribution of local axes for the whole phase
+orientation_modes = Literal["sections", "distribution"]
+
 
 class add_orientation(Template):
+    keywords = ("Solid Section",)
+
     def __init__(
-        self, phase_name: str, orientation_list: npt.NDArray[np.float64]
+        self,
+        phase_name: str,
+        orientation_list: npt.NDArray[np.float64],
+        angle_tolerance: float | None = None,
+        output_mode: orientation_modes = "sections",
+        fiber_elements: (
+            tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]] | None
+        ) = None,
     ) -> None:
+        """
+        Args:
+            phase_name (str): phase whose Solid Section is split into one per fiber
+            orientation_list (npt.NDArray[np.float64]): theta and phi of each fiber
+            angle_tolerance (float | None, optional): when set, fibers whose directions
+                agree within this angle in degrees share one *Orientation. Fiber
+                directions are treated as lines, so opposite directions are merged
+                too. Between 0 and 90, exclusive, and only for the "sections" mode.
+                Defaults to None.
+            output_mode (orientation_modes, optional): "sections" or "distribution".
+                Defaults to "sections".
+            fiber_elements (tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]] | None,
+                optional): element ids and fiber number of each element, as returned
+                by AbaqusInputFile.get_instance_elements. Needed for the
+                "distribution" mode, they may be set after config() is taken.
+                Defaults to None.
+        """
+        if output_mode == "distribution" and angle_tolerance is not None:
+            raise ValueError("angle_tolerance only applies to the sections mode")
+        if angle_tolerance is not None and not 0 < angle_tolerance < 90:
+            raise ValueError(
+                f"angle_tolerance {angle_tolerance} is not between 0 and 90 degrees"
+            )
         self.phase_name = phase_name
         self.orientation_list = orientation_list
+        self.angle_tolerance = angle_tolerance
+        self.output_mode = output_mode
+        self.fiber_elements = fiber_elements
         self.orientation_ID = 0
         self.lines_to_skip = 1
+        # Largest angle in degrees between a fiber and its shared orientation
+        self.max_angle_error: float | None = None
+
+    def config(self) -> dict[str, object]:
+        """Template.config without the fiber elements, which are read from the input
+        file that an output manifest already hashes"""
+        config = super().config()
+        config["params"] = {
+            key: value
+            for key, value in config["params"].items()  # type: ignore
+            if key != "fiber_elements"
+        }
+        return config
 
     def descriptor(self) -> LiteralString:
         return "Adds the orientation of the elset to the input file"
@@ -41,26 +97,167 @@ class add_orientation(Template):
         Returns:
             tuple[list[str], int]: _description_
         """
+        new_lines, skip_lines = self.stream_line(lines)
+        return "".join(new_lines).splitlines(keepends=True), skip_lines
+
+    def stream_line(self, lines: list[str]) -> tuple[Iterator[str], int]:
+        """Same as process_line, but the lines are generated while the output is
+        written, FORMAT_BATCH fibers per string
+
+        Returns:
+            tuple[Iterator[str], int]: generator of the new text, number of lines to skip
+        """
+        return self.orientation_lines(lines), self.lines_to_skip
+
+    def fiber_directions(self) -> npt.NDArray[np.float64]:
+        """(F, 3) unit fiber direction of every fiber"""
+        angles = np.atleast_2d(np.asarray(self.orientation_list, dtype=np.float64))
+        return vt.spherical_to_cartesian_array(theta=angles[:, 0], phi=angles[:, 1])
+
+    def orientation_matrix(
+        self, directions: npt.NDArray[np.float64] | None = None
+    ) -> npt.NDArray[np.float64]:
+        """Fiber direction a and perpendicular direction b of every fiber
+
+        Args:
+            directions (npt.NDArray[np.float64] | None, optional): (N, 3) directions a.
+                Defaults to the directions of all fibers.
+
+        Returns:
+            npt.NDArray[np.float64]: (N, 6) rows of a_x, a_y, a_z, b_x, b_y, b_z
+        """
+        a_points = self.fiber_directions() if directions is None else directions
+        b_points = vt.perpendicular_vectors(a_points)
+        return np.concatenate((a_points, b_points), axis=1)
+
+    def shared_orientations(
+        self,
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+        """Cluster the fibers by direction within angle_tolerance
+
+        Returns:
+            npt.NDArray[np.int64]: (F,) cluster of each fiber
+            npt.NDArray[np.float64]: (C, 6) orientation of each cluster
+        """
+        directions = self.fiber_directions()
+        labels, representatives = vt.cluster_directions(
+            directions, np.radians(self.angle_tolerance)
+        )
+        errors = vt.angles_between(directions, representatives[labels])
+        self.max_angle_error = float(np.degrees(errors.max())) if len(errors) else 0.0
+        logger.info(
+            f"Quantized {len(labels)} {self.phase_name} orientations to "
+            f"{len(representatives)} within {self.angle_tolerance} degrees, "
+            f"max angle error {self.max_angle_error:.3f} degrees"
+        )
+        return labels, self.orientation_matrix(representatives)
+
+    def orientation_lines(self, lines: list[str]) -> Iterator[str]:
+        """Lines of every fiber, rendered FORMAT_BATCH fibers per string"""
+        # Names and elsets are pasted into %-format templates
+        phase_name = self.phase_name.replace("%", "%%")
+        orientation_template = (
+            f"*Orientation, name=Ori-{phase_name}-%d\n"
+            + ", ".join(["%6e"] * 6)
+            + "\n3, 0.\n"
+        )
+        section_template = (
+            f"*Solid Section, elset={phase_name}_%d, material=Carbon_Fiber, "
+            + f"orientation=Ori-{phase_name}-%d\n"
+            + ",\n"
+        )
         for line in lines:
             if "Solid Section" not in line or f"{self.phase_name}" not in line:
                 continue
 
-            new_lines: list[str] = []
-            for fiber_num, row in enumerate(self.orientation_list):
-                # logger.debug(f"Parameters list: {param_list}")
-                row = self.orientation_list[int(fiber_num)]
-
-                a_points = vt.spherical_to_cartesian(theta=row[0], phi=row[1])
-                b_points = vt.perpendicular_vector(a_points)
-                orientation_name = self.next_orientation_ID()
-                orientation = np.append(a_points, b_points)
-
-                new_lines.append(f"*Orientation, name={orientation_name}\n")
-                new_lines.append(", ".join(f"{x:6e}" for x in orientation) + "\n")
-                new_lines.append("3, 0.\n")
-                new_lines.append(
-                    f"*Solid Section, elset={self.phase_name}_{fiber_num}, material=Carbon_Fiber, orientation={orientation_name}\n"
+            if self.output_mode == "distribution":
+                yield from self.distribution_lines(line)
+                continue
+
+            if self.angle_tolerance is None:
+                orientation = self.orientation_matrix()
+                fiber_num = np.arange(len(orientation))
+                orientation_ID = fiber_num + self.orientation_ID
+                self.orientation_ID += len(orientation)
+                yield from format_rows(
+                    orientation_template + section_template,
+                    orientation_ID,
+                    orientation,
+                    fiber_num,
+                    orientation_ID,
                 )
-                new_lines.append(",\n")
+                continue
+
+            # Shared orientations first, then the sections that reference them
+            labels, orientation = self.shared_orientations()
+            orientation_ID = np.arange(len(orientation)) + self.orientation_ID
+            self.orientation_ID += len(orientation)
+            yield from format_rows(orientation_template, orientation_ID, orientation)
+            yield from format_rows(
+                section_template, np.arange(len(labels)), orientation_ID[labels]
+            )
+
+    def element_fibers(self) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """Fiber of every fiber element
+
+        Returns:
+            npt.NDArray[np.int64]: sorted element ids
+            npt.NDArray[np.int64]: fiber number of each element, its orientation row
+        """
+        if self.fiber_elements is None:
+            raise ValueError("The distribution mode needs the elements of each fiber")
+        element_ids, fiber_num = self.fiber_elements
+        num_fibers = len(np.atleast_2d(self.orientation_list))
+        if len(fiber_num) and fiber_num.max() >= num_fibers:
+            raise ValueError(
+                f"{self.phase_name}_{fiber_num.max()} has no row in the orientation list"
+            )
+        # An element listed in several fibers takes the orientation of the first
+        element_ids, first = np.unique(element_ids, return_index=True)
+        return element_ids, fiber_num[first]
+
+    def distribution_lines(self, line: str) -> Iterator[str]:
+        """One *Distribution of the local axes of every fiber element, referenced by one
+        *Orientation and the original Solid Section of the phase"""
+        orientation_name = self.next_orientation_ID()
+        table_name = f"{orientation_name}-Table"
+        distribution_name = f"{orientation_name}-Distribution"
+        element_ids, fiber_num = self.element_fibers()
+        # Every element of a fiber has the same axes, so each fiber is formatted once
+        fiber_axes = np.array(
+            "".join(
+                format_rows(", ".join(["%6e"] * 6) + "\n", self.orientation_matrix())
+            ).splitlines(),
+            dtype=object,
+        )
+
+        yield f"*Distribution Table, name={table_name}\ncoord3D, coord3D\n"
+        yield (
+            f"*Distribution, name={distribution_name}, location=ELEMENT, "
+            f"table={table_name}\n"
+            # Default for elements of the phase outside every fiber
+            ", 1., 0., 0., 0., 1., 0.\n"
+        )
+        yield from format_rows("%d, %s\n", element_ids, fiber_axes[fiber_num])
+        yield (
+            f"*Orientation, name={orientation_name}, system=RECTANGULAR\n"
+            f"{distribution_name}\n"
+            "3, 0.\n"
+        )
+        yield f"{line.rstrip()}, orientation={orientation_name}\n,\n"
+
 
-        return new_lines, self.lines_to_skip
+def format_rows(template: str, *columns: npt.NDArray) -> Iterator[str]:
+    """Render a %-format template once per row of the columns, FORMAT_BATCH rows per
+    string. 1D columns fill one field, 2D columns one field per column."""
+    columns_2d = [column[:, None] if column.ndim == 1 else column for column in columns]
+    num_rows = len(columns_2d[0])
+    num_fields = sum(column.shape[1] for column in columns_2d)
+    for first in range(0, num_rows, FORMAT_BATCH):
+        last = min(first + FORMAT_BATCH, num_rows)
+        fields = np.empty((last - first, num_fields), dtype=object)
+        field = 0
+        for column in columns_2d:
+            fields[:, field : field + column.shape[1]] = column[first:last].tolist()
+            field += column.shape[1]
+        yield (template * (last - first)) % tuple(fields.ravel().tolist())
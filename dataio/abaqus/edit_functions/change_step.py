@@ -1,4 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
 import shutil
+from typing import Literal
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows, reflinks are not available
+    fcntl = None
+
+# ioctl request that makes a file share the data blocks of another (Btrfs, XFS)
+FICLONE = 0x40049409
+
+# "include" writes small driver files that *INCLUDE the shared model, "standalone"
+# writes complete files, cloned from the model where the filesystem supports it
+variant_modes = Literal["include", "standalone"]
+
+
+def clone_file(source: str, target: str) -> bool:
+    """Copy a file as a reflink sharing its data blocks when the filesystem supports
+    it, else as a plain copy
+
+    Returns:
+        bool: True if the copy is a reflink
+    """
+    if fcntl is not None:
+        with open(source, "rb") as source_file, open(target, "wb") as target_file:
+            try:
+                fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+                return True
+            except OSError:
+                pass
+    shutil.copyfile(source, target)
+    return False
+
+
+def link_file(source: str, target: str) -> None:
+    """Make target refer to the content of source: a hard link, else a reflink, else
+    a copy. An existing target that is not the same file is replaced."""
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return
+    temporary = f"{target}.tmp"
+    try:
+        os.link(source, temporary)
+    except OSError:
+        clone_file(source, temporary)
+    os.replace(temporary, target)
+
+
+def include_line(path: str, output_path: str) -> str:
+    relative = os.path.relpath(path, output_path)
+    return f"*INCLUDE, INPUT={relative.replace(os.sep, '/')}\n"
+
+
+def ends_with_newline(file_path: str) -> bool:
+    with open(file_path, "rb") as file:
+        if file.seek(0, os.SEEK_END) == 0:
+            return True
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
 
 
 def add_step(
@@ -7,18 +67,60 @@ def add_step(
     step_names: list[str],
     output_path: str,
     no_step: bool = True,
-):
-    """Creates a input and adds a new step to it using the *Include keyword provided by Abaqus
+    mode: variant_modes = "include",
+    link_model: bool = False,
+    workers: int | None = None,
+) -> list[str]:
+    """Creates an input file per step that adds the step to the model using the
+    *Include keyword provided by Abaqus
+
+    In "include" mode each variant is a driver file of two *INCLUDE lines, the model
+    and the step, so the model is never duplicated. In "standalone" mode each variant
+    is a clone of the model (a reflink on Btrfs/XFS, else a copy) with the step
+    *INCLUDE appended.
 
     Args:
         input_file (str): Input file of interest, including extension name
-        step_names (list[str]): list of .inc files that contains steps
+        input_path (str): directory of the input file
+        step_names (list[str]): list of .inc files that contains steps, referenced as
+            given relative to the output directory
+        output_path (str): directory of the variants
+        no_step (bool, optional): kept for compatibility. Defaults to True.
+        mode (variant_modes, optional): "include" or "standalone". Defaults to "include".
+        link_model (bool, optional): in "include" mode, hard link (else reflink or
+            copy) the model into the output directory and include that, for batch
+            nodes that only see the job directory. Defaults to False.
+        workers (int | None, optional): threads writing the variants. Defaults to the
+            ThreadPoolExecutor default.
+
+    Returns:
+        list[str]: paths of the variants, in the order of step_names
     """
-    original_input_path = f"{input_path}\\{input_file}"
-    for step_file in step_names:
-        step_name = step_file[:-3]
-        output_file_path = f"{output_path}\\{input_file[:-3]}-{step_name}.inp"
-        shutil.copy(original_input_path, output_file_path)
-
-        with open(output_file_path, "a") as file:
-            file.write(f"*INCLUDE, INPUT={step_name}")
+    original_input_path = os.path.join(input_path, input_file)
+    os.makedirs(output_path, exist_ok=True)
+    model_path = original_input_path
+    if mode == "include" and link_model:
+        model_path = os.path.join(output_path, input_file)
+        link_file(original_input_path, model_path)
+    model_include = include_line(model_path, output_path)
+    separator = "" if ends_with_newline(original_input_path) else "\n"
+
+    def write_variant(step_file: str) -> str:
+        step_name = os.path.splitext(os.path.basename(step_file))[0]
+        output_file_path = os.path.join(
+            output_path, f"{os.path.splitext(input_file)[0]}-{step_name}.inp"
+        )
+        step_include = f"*INCLUDE, INPUT={step_file}\n"
+        if mode == "include":
+            with open(output_file_path, "w") as file:
+                file.write(model_include + step_include)
+        else:
+            clone_file(original_input_path, output_file_path)
+            with open(output_file_path, "a") as file:
+                file.write(separator + step_include)
+        return output_file_path
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        output_files = list(pool.map(write_variant, step_names))
+    logger.info(f"Wrote {len(output_files)} {mode} step variants of {input_file}")
+    return output_files
@@ -0,0 +1,239 @@
+from typing import Iterable, NotRequired, Sequence, TypedDict
+from loguru import logger
+from .TemplateEditFunction import SKIP_BLOCK, TemplateEditFunction as Template
+from ..keyword_index import index_entry, line_keyword, normalize_keyword
+
+# Abaqus reads at most this many values from one material data line
+VALUES_PER_LINE = 8
+
+
+class material_edit(TypedDict):
+    material: str  # Name of the *Material, e.g. "Carbon_Fiber"
+    property: str  # Property keyword, e.g. "Conductivity" or "Specific Heat"
+    # One row per data record, e.g. [(k,)] or [(k1, T1), (k2, T2)] for temperature
+    # dependent data. Rows longer than VALUES_PER_LINE continue on the next line.
+    values: Sequence[Sequence[float]]
+    params: NotRequired[dict[str, str]]  # Keyword parameters, e.g. {"type": "ORTHO"}
+
+
+def property_lines(edit: material_edit) -> list[str]:
+    """Keyword line and data lines of a property block"""
+    params = "".join(
+        f", {key}={value}" for key, value in edit.get("params", {}).items()
+    )
+    lines = [f"*{edit['property']}{params}\n"]
+    for row in edit["values"]:
+        for start in range(0, max(len(row), 1), VALUES_PER_LINE):
+            values = row[start : start + VALUES_PER_LINE]
+            lines.append(",".join(f"{x:6e}" for x in values) + "\n")
+    return lines
+
+
+# Normalized keywords of the options of a *Material definition. A material runs from
+# its *Material line up to the first keyword that is not one of these.
+material_options = {
+    "conductivity",
+    "density",
+    "specificheat",
+    "latentheat",
+    "heatgeneration",
+    "inelasticheatfraction",
+    "jouleheatfraction",
+    "elastic",
+    "failstress",
+    "failstrain",
+    "plastic",
+    "hyperelastic",
+    "hyperfoam",
+    "viscoelastic",
+    "creep",
+    "swelling",
+    "expansion",
+    "damping",
+    "depvar",
+    "usermaterial",
+    "userdefinedfield",
+    "userelementtime",
+    "electricalconductivity",
+    "dielectric",
+    "piezoelectric",
+    "permeability",
+    "sorption",
+    "porousbulkmoduli",
+    "moistureswelling",
+    "damageinitiation",
+    "damageevolution",
+    "damagestabilization",
+    "ductiledamageinitiation",
+    "sheardamageinitiation",
+    "cyclichardening",
+    "ratedependent",
+    "potential",
+    "mullinseffect",
+    "hysteresis",
+    "druckerprager",
+    "druckerpragerhardening",
+    "mohrcoulomb",
+    "mohrcoulombhardening",
+    "concretedamagedplasticity",
+    "concretetensionstiffening",
+    "concretecompressionhardening",
+    "regularize",
+}
+
+
+def find_material_blocks(
+    entries: list[index_entry],
+    options: set[str] = material_options,
+) -> dict[tuple[str, str], index_entry]:
+    """Property blocks of every material in a keyword index
+
+    A material runs from its *Material line to the first keyword that is not one of
+    its options, e.g. *Step, *Part or another *Material.
+
+    Args:
+        entries (list[index_entry]): keyword index of the input
+        options (set[str], optional): normalized keywords of material options.
+            Defaults to material_options.
+
+    Returns:
+        dict[tuple[str, str], index_entry]: entry of each (material, property), both
+            lower case and normalized, e.g. ("carbon_fiber", "specificheat")
+    """
+    blocks: dict[tuple[str, str], index_entry] = {}
+    material: str | None = None
+    for entry in entries:
+        keyword = normalize_keyword(entry["keyword"])
+        if keyword == "material":
+            material = entry["name"].lower()
+        elif keyword not in options:
+            material = None
+        elif material is not None:
+            blocks.setdefault((material, keyword), entry)
+    return blocks
+
+
+class edit_materials(Template):
+    """Replace property blocks of any number of materials in one pass
+
+    The property blocks to replace are resolved up front from the keyword index of the
+    input, so the function only declares the edited property keywords and each of
+    their keyword lines is matched to the resolved blocks by its rank among the lines
+    with the same keyword. The whole data block of a property is replaced, whatever
+    its number of lines, so multi-line and temperature dependent data are supported.
+    """
+
+    def __init__(
+        self, edits: Iterable[material_edit], entries: list[index_entry]
+    ) -> None:
+        """
+        Args:
+            edits (Iterable[material_edit]): new data of each (material, property).
+                A later edit of the same property replaces an earlier one.
+            entries (list[index_entry]): keyword index of the input file that is
+                edited, e.g. AbaqusInputFile.index_keywords(). Only blocks of the file
+                itself are edited, not those of files it includes.
+        """
+        self.edits: dict[str, dict[str, material_edit]] = {}
+        for edit in edits:
+            self.edits.setdefault(edit["material"].lower(), {})[
+                normalize_keyword(edit["property"])
+            ] = edit
+        if not self.edits:
+            raise ValueError("edit_materials needs at least one edit")
+        self.keywords = tuple(
+            dict.fromkeys(
+                edit["property"]
+                for material in self.edits.values()
+                for edit in material.values()
+            )
+        )
+        # Edited properties count as material options, even if not in material_options
+        self.options = material_options | {
+            keyword for material in self.edits.values() for keyword in material
+        }
+        self.targets = self.resolve(entries)
+        # Keyword lines of each edited keyword seen so far
+        self.seen = dict.fromkeys(map(normalize_keyword, self.keywords), 0)
+        self.current_edit: tuple[str, str] | None = None
+        self.applied: set[tuple[str, str]] = set()
+
+    def resolve(self, entries: list[index_entry]) -> dict[str, dict[int, str]]:
+        """Rank of each edited block among the keyword lines with its keyword
+
+        Returns:
+            dict[str, dict[int, str]]: material of the block at each rank, by keyword
+        """
+        # The writer only reads the lines of the file itself, included files keep
+        # their *INCLUDE line
+        own_entries = [e for e in entries if e.get("file") == entries[0].get("file")]
+        blocks = find_material_blocks(own_entries, self.options)
+        # Rank of each entry by offset, which is unique within one file
+        ranks: dict[int, int] = {}
+        counts: dict[str, int] = {}
+        for entry in own_entries:
+            keyword = normalize_keyword(entry["keyword"])
+            ranks[entry["offset"]] = counts.get(keyword, 0)
+            counts[keyword] = ranks[entry["offset"]] + 1
+
+        targets: dict[str, dict[int, str]] = {}
+        for material, properties in self.edits.items():
+            for keyword in properties:
+                entry = blocks.get((material, keyword))
+                if entry is not None:
+                    targets.setdefault(keyword, {})[ranks[entry["offset"]]] = material
+        return targets
+
+    def description(self) -> str:
+        return "Replaces the data of material properties."
+
+    def common_name(self) -> str:
+        return "Edit Materials"
+
+    def check_line(self, lines: list[str]) -> bool:
+        for line in lines:
+            keyword = line_keyword(line)
+            if keyword not in self.seen:
+                continue
+            rank = self.seen[keyword]
+            self.seen[keyword] += 1
+            material = self.targets.get(keyword, {}).get(rank)
+            if material is not None:
+                self.current_edit = (material, keyword)
+                return True
+        return False
+
+    def process_line(self, lines: list[str]) -> tuple[list[str], int]:
+        if self.current_edit is None:
+            return lines, 0
+        material, keyword = self.current_edit
+        self.current_edit = None
+        self.applied.add((material, keyword))
+        return property_lines(self.edits[material][keyword]), SKIP_BLOCK
+
+    def missing(self, entries: list[index_entry] | None = None) -> list[material_edit]:
+        """Edits without a property block to replace
+
+        Args:
+            entries (list[index_entry] | None, optional): keyword index of the input,
+                to check before the file is written. Defaults to None, which lists the
+                edits that were not applied while writing.
+
+        Returns:
+            list[material_edit]: edits that are not (or were not) applied
+        """
+        if entries is not None:
+            present = set(find_material_blocks(entries, self.options))
+        else:
+            present = self.applied
+        missing = [
+            edit
+            for material, properties in self.edits.items()
+            for keyword, edit in properties.items()
+            if (material, keyword) not in present
+        ]
+        for edit in missing:
+            logger.warning(
+                f"Material {edit['material']} has no {edit['property']} to replace"
+            )
+        return missing
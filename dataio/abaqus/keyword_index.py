@@ -0,0 +1,372 @@
+import hashlib
+import json
+import mmap
+import os
+from typing import Literal, TypedDict
+from loguru import logger
+from ..compressed_io import is_compressed, open_binary
+from ..data_parsing import line_to_list
+
+# 2: content hashes are sha256 (blake2b before)
+INDEX_VERSION = 2
+SIDECAR_SUFFIX = ".kwidx.json"
+HASH_CHUNK_SIZE = 1 << 24
+COUNT_CHUNK_SIZE = 1 << 26
+
+scan_methods = Literal["mmap", "lines"]
+
+
+class index_entry(TypedDict):
+    keyword: str  # Keyword without the asterisk and whitespace, e.g. "SolidSection"
+    name: str
+    params: dict[str, str]  # Parameter names are lower case, flags map to ""
+    header: str
+    line: int  # Zero based line number of the keyword line
+    offset: int  # Byte offset of the keyword line
+    data_offset: int  # Byte offset of the first data line
+    length: int  # Byte length of the block, keyword line included
+    file: (
+        str  # Physical file of the block, differs from the main file for *INCLUDE files
+    )
+
+
+class file_signature(TypedDict):
+    size: int
+    mtime_ns: int
+    hash: str
+
+
+class keyword_index(TypedDict):
+    version: int
+    signature: file_signature
+    entries: list[index_entry]
+
+
+def parse_keyword_line(line: str) -> tuple[str, dict[str, str]]:
+    """Split a keyword line into the keyword and its parameters
+
+    Args:
+        line (str): keyword line, e.g. "*Elset, elset=Fiber_0, generate"
+
+    Returns:
+        str: keyword without the asterisk, e.g. "Elset"
+        dict[str, str]: parameters keyed by lower case name
+    """
+    param_list = line_to_list(line)
+    params: dict[str, str] = {}
+    for param in param_list[1:]:
+        if param == "":
+            continue
+        key, _, value = param.partition("=")
+        params[key.lower()] = value
+    return param_list[0][1:], params
+
+
+def entry_name(params: dict[str, str]) -> str:
+    for key in ("name", "elset", "nset", "input"):
+        if key in params:
+            return params[key]
+    return ""
+
+
+def new_entry(line: bytes, line_no: int, offset: int) -> index_entry:
+    header = line.decode("utf-8", errors="replace")
+    keyword, params = parse_keyword_line(header)
+    return {
+        "keyword": keyword,
+        "name": entry_name(params),
+        "params": params,
+        "header": header.rstrip("\r\n"),
+        "line": line_no,
+        "offset": offset,
+        "data_offset": offset + len(line),
+        "length": 0,
+        "file": "",
+    }
+
+
+def is_keyword_line(line: bytes) -> bool:
+    return line.startswith(b"*") and not line.startswith(b"**")
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Lower case keyword without asterisk and whitespace, e.g. "solidsection" for
+    "*Solid Section", as keywords are compared in Abaqus"""
+    return "".join(keyword.lstrip("*").split()).lower()
+
+
+def line_keyword(line: str) -> str | None:
+    """Normalized keyword of a keyword line, None for data and comment lines"""
+    if not line.startswith("*") or line.startswith("**"):
+        return None
+    return normalize_keyword(line.split(",", 1)[0])
+
+
+def scan_keywords(
+    file_path: str, method: scan_methods = "mmap"
+) -> tuple[list[index_entry], str]:
+    """Read the file once and record every keyword line
+
+    Args:
+        file_path (str): path to the Abaqus input file
+        method (scan_methods, optional): "mmap" jumps between keyword lines on the raw
+            bytes, "lines" iterates over every line. Compressed files are always read
+            line by line. Defaults to "mmap".
+
+    Returns:
+        list[index_entry]: one entry per keyword line, in file order, with offsets in
+            the uncompressed data
+        str: content hash of the file, of the compressed bytes for compressed files
+    """
+    if method == "mmap" and not is_compressed(file_path):
+        return scan_keywords_mmap(file_path)
+    return scan_keywords_lines(file_path)
+
+
+def scan_keywords_lines(file_path: str) -> tuple[list[index_entry], str]:
+    """Read the file line by line and record every keyword line
+
+    Args:
+        file_path (str): path to the Abaqus input file
+
+    Returns:
+        list[index_entry]: one entry per keyword line, in file order
+        str: content hash of the file
+    """
+    entries: list[index_entry] = []
+    hasher = hashlib.sha256()
+    compressed = is_compressed(file_path)
+    offset = 0
+    with open_binary(file_path) as file:
+        for line_no, line in enumerate(file):
+            if not compressed:
+                hasher.update(line)
+            if is_keyword_line(line):
+                entries.append(new_entry(line, line_no, offset))
+            offset += len(line)
+
+    close_entries(entries, offset)
+    if compressed:
+        # The sidecar is validated against the file as stored on disk
+        return entries, hash_file(file_path)
+    return entries, hasher.hexdigest()
+
+
+def count_newlines(buffer: mmap.mmap, start: int, stop: int) -> int:
+    count = 0
+    for chunk_start in range(start, stop, COUNT_CHUNK_SIZE):
+        count += buffer[chunk_start : min(chunk_start + COUNT_CHUNK_SIZE, stop)].count(
+            b"\n"
+        )
+    return count
+
+
+def count_comment_lines(buffer: mmap.mmap, start: int, stop: int) -> int:
+    """Number of ** comment lines between start, a line start, and stop"""
+    count = int(buffer[start : min(start + 2, stop)] == b"**")
+    for chunk_start in range(start, stop, COUNT_CHUNK_SIZE):
+        chunk_stop = min(chunk_start + COUNT_CHUNK_SIZE, stop)
+        # The 2 bytes after the chunk complete a b"\n**" that starts inside it
+        count += buffer[chunk_start : min(chunk_stop + 2, stop)].count(b"\n**")
+    return count
+
+
+def scan_keywords_mmap(file_path: str) -> tuple[list[index_entry], str]:
+    """Memory map the file and jump between b"\\n*" occurrences, so only the keyword
+    lines are decoded
+
+    Args:
+        file_path (str): path to the Abaqus input file
+
+    Returns:
+        list[index_entry]: one entry per keyword line, in file order
+        str: content hash of the file
+    """
+    entries: list[index_entry] = []
+    hasher = hashlib.sha256()
+    if os.path.getsize(file_path) == 0:
+        return entries, hasher.hexdigest()
+
+    with open(file_path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        hasher.update(buffer)
+        size = len(buffer)
+
+        def next_keyword(position: int) -> int:
+            found = buffer.find(b"\n*", position)
+            return -1 if found == -1 else found + 1
+
+        line_no = 0
+        counted_to = 0
+        start = 0 if buffer[:1] == b"*" else next_keyword(0)
+        while start != -1:
+            end = buffer.find(b"\n", start)
+            end = size if end == -1 else end + 1
+            line = buffer[start:end]
+
+            line_no += count_newlines(buffer, counted_to, start)
+            counted_to = start
+            if is_keyword_line(line):
+                entries.append(new_entry(line, line_no, start))
+
+            start = next_keyword(end - 1)
+
+    close_entries(entries, size)
+    return entries, hasher.hexdigest()
+
+
+def close_entries(entries: list[index_entry], file_size: int) -> None:
+    """Set the length of each block, which runs until the next keyword line"""
+    for entry, next_entry in zip(entries, entries[1:]):
+        entry["length"] = next_entry["offset"] - entry["offset"]
+    if entries:
+        entries[-1]["length"] = file_size - entries[-1]["offset"]
+
+
+def hash_file(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def sidecar_path(file_path: str) -> str:
+    return f"{file_path}{SIDECAR_SUFFIX}"
+
+
+def load_index(file_path: str) -> keyword_index | None:
+    """Load the sidecar index of a file if it is still valid
+
+    The sidecar is trusted when the size and modification time match. When only the
+    modification time changed (e.g. the file was copied), the content hash decides.
+
+    Returns:
+        keyword_index | None: the stored index, None if missing or out of date
+    """
+    try:
+        with open(sidecar_path(file_path), "r") as file:
+            index: keyword_index = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if index.get("version") != INDEX_VERSION:
+        return None
+
+    stat = os.stat(file_path)
+    signature = index["signature"]
+    if signature["size"] != stat.st_size:
+        return None
+    if signature["mtime_ns"] == stat.st_mtime_ns:
+        return index
+
+    if hash_file(file_path) != signature["hash"]:
+        return None
+    signature["mtime_ns"] = stat.st_mtime_ns
+    save_index(file_path, index)
+    return index
+
+
+def save_index(file_path: str, index: keyword_index) -> None:
+    try:
+        with open(sidecar_path(file_path), "w") as file:
+            json.dump(index, file)
+    except OSError as e:
+        logger.warning(f"Could not write keyword index for {file_path}: {e}")
+
+
+def build_index(
+    file_path: str, use_sidecar: bool = True, method: scan_methods = "mmap"
+) -> keyword_index:
+    """Return the keyword index of a file, reusing the sidecar when it is valid
+
+    Args:
+        file_path (str): path to the Abaqus input file
+        use_sidecar (bool, optional): read and write the sidecar file. Defaults to True.
+        method (scan_methods, optional): scanning method, see scan_keywords. Defaults to "mmap".
+
+    Returns:
+        keyword_index: signature of the file and its keyword entries
+    """
+    if use_sidecar:
+        index = load_index(file_path)
+        if index is not None:
+            logger.info(f"Loaded keyword index from {sidecar_path(file_path)}")
+            return with_file(index, file_path)
+
+    stat = os.stat(file_path)
+    entries, content_hash = scan_keywords(file_path, method)
+    index: keyword_index = {
+        "version": INDEX_VERSION,
+        "signature": {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": content_hash,
+        },
+        "entries": entries,
+    }
+    logger.info(f"Indexed {len(entries)} keywords in {file_path}")
+
+    if use_sidecar:
+        save_index(file_path, index)
+    return with_file(index, file_path)
+
+
+def with_file(index: keyword_index, file_path: str) -> keyword_index:
+    for entry in index["entries"]:
+        entry["file"] = file_path
+    return index
+
+
+def include_path(file_path: str, entry: index_entry) -> str:
+    """Path of the file referenced by an *INCLUDE entry, relative paths are resolved
+    against the directory of the including file"""
+    input_name = entry["params"].get("input", "").strip("'\"")
+    return os.path.normpath(os.path.join(os.path.dirname(file_path), input_name))
+
+
+def build_logical_index(
+    file_path: str,
+    use_sidecar: bool = True,
+    method: scan_methods = "mmap",
+    parents: tuple[str, ...] = (),
+) -> keyword_index:
+    """Return the keyword index of a file with *INCLUDE files resolved recursively.
+    Entries of an included file follow its *INCLUDE entry and keep the path and
+    offsets of their physical file. Every file keeps its own sidecar, so unchanged
+    include files are not scanned again.
+
+    Args:
+        file_path (str): path to the main Abaqus input file
+        use_sidecar (bool, optional): read and write sidecar files. Defaults to True.
+        method (scan_methods, optional): scanning method, see scan_keywords. Defaults to "mmap".
+
+    Returns:
+        keyword_index: logical index, the hash combines the hashes of every file
+    """
+    index = build_index(file_path, use_sidecar, method)
+    entries: list[index_entry] = []
+    hashes: list[str] = [index["signature"]["hash"]]
+    for entry in index["entries"]:
+        entries.append(entry)
+        if entry["keyword"].lower() != "include":
+            continue
+
+        included = include_path(file_path, entry)
+        if included in parents or included == os.path.normpath(file_path):
+            raise ValueError(f"{file_path} includes itself through {included}")
+        if not os.path.exists(included):
+            logger.warning(f"Included file {included} of {file_path} not found")
+            continue
+
+        sub_index = build_logical_index(
+            included, use_sidecar, method, parents + (os.path.normpath(file_path),)
+        )
+        entries.extend(sub_index["entries"])
+        hashes.append(sub_index["signature"]["hash"])
+
+    signature = index["signature"].copy()
+    if len(hashes) > 1:
+        signature["hash"] = hashlib.sha256("".join(hashes).encode()).hexdigest()
+    return {"version": INDEX_VERSION, "signature": signature, "entries": entries}
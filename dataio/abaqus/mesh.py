@@ -0,0 +1,501 @@
+import numpy as np
+import numpy.typing as npt
+from ..data_parsing import strip_comments, text_to_array
+
+# Ids spanning at most this many times the number of ids get a dense lookup table
+DENSE_SPAN_FACTOR = 2
+
+# Node count of the common Abaqus element types. The trailing digits of a name are
+# not always its node count, e.g. B31 has 2 nodes and S4R5 has 4.
+element_types_by_nodes: dict[int, tuple[str, ...]] = {
+    1: ("MASS", "ROTARYI", "SPRING1", "DASHPOT1", "HEATCAP", "DCOUP3D"),
+    2: (
+        ("B21", "B21H", "B31", "B31H", "B31OS", "PIPE21", "PIPE31", "T2D2", "T3D2")
+        + ("T2D2H", "T3D2H", "T3D2T", "DC1D2", "DCC1D2", "SPRING2", "SPRINGA")
+        + ("DASHPOT2", "DASHPOTA", "CONN2D2", "CONN3D2", "GAPUNI", "R2D2", "RB2D2")
+        + ("RB3D2", "DINTER2")
+    ),
+    3: (
+        ("B22", "B22H", "B32", "B32H", "B32OS", "PIPE22", "PIPE32", "T2D3", "T3D3")
+        + ("DC1D3", "CPS3", "CPE3", "CPE3H", "CAX3", "CAX3H", "DC2D3", "DCAX3")
+        + ("S3", "S3R", "S3RS", "STRI3", "DS3", "M3D3", "R3D3", "SFM3D3", "SAX1")
+    ),
+    4: (
+        ("B23", "B33", "CPS4", "CPS4R", "CPS4I", "CPE4", "CPE4R", "CPE4H", "CPE4RH")
+        + ("CPE4I", "CPE4IH", "CAX4", "CAX4R", "CAX4H", "CAX4RH", "CAX4I", "DC2D4")
+        + ("DCAX4", "DCC2D4", "S4", "S4R", "S4RS", "S4R5", "DS4", "M3D4", "M3D4R")
+        + ("R3D4", "SFM3D4", "SFM3D4R", "COH2D4", "C3D4", "C3D4H", "C3D4T", "DC3D4")
+    ),
+    6: (
+        ("CPS6", "CPS6M", "CPE6", "CPE6H", "CPE6M", "CPE6MH", "CAX6", "CAX6H")
+        + ("CAX6M", "CAX6MH", "DC2D6", "DCAX6", "STRI65", "DS6", "M3D6", "SC6R")
+        + ("COH3D6", "C3D6", "C3D6H", "C3D6T", "DC3D6")
+    ),
+    8: (
+        ("CPS8", "CPS8R", "CPE8", "CPE8R", "CPE8H", "CPE8RH", "CAX8", "CAX8R")
+        + ("CAX8H", "CAX8RH", "DC2D8", "DCAX8", "S8R", "S8R5", "DS8", "M3D8")
+        + ("M3D8R", "SC8R", "COH3D8", "C3D8", "C3D8R", "C3D8H", "C3D8RH", "C3D8I")
+        + ("C3D8IH", "C3D8T", "C3D8RT", "C3D8HT", "C3D8RHT", "DC3D8", "DCC3D8")
+        + ("DCC3D8D", "AC3D8")
+    ),
+    9: ("S9R5", "M3D9", "M3D9R"),
+    10: (
+        ("C3D10", "C3D10H", "C3D10M", "C3D10MH", "C3D10T", "C3D10MT", "C3D10MHT")
+        + ("C3D10HS", "C3D10I", "DC3D10", "AC3D10")
+    ),
+    15: ("C3D15", "C3D15H", "DC3D15", "AC3D15"),
+    20: ("C3D20", "C3D20R", "C3D20H", "C3D20RH", "C3D20T", "C3D20RT", "DC3D20"),
+}
+element_node_counts: dict[str, int] = {
+    element_type: num_nodes
+    for num_nodes, element_types in element_types_by_nodes.items()
+    for element_type in element_types
+}
+
+# Node positions (one based, as in the Abaqus manual) of faces S1, S2, ... of
+# three dimensional solid elements, keyed by the number of nodes
+face_definitions: dict[int, tuple[tuple[int, ...], ...]] = {
+    4: ((1, 2, 3), (1, 4, 2), (2, 4, 3), (3, 4, 1)),
+    10: (
+        (1, 2, 3, 5, 6, 7),
+        (1, 4, 2, 8, 9, 5),
+        (2, 4, 3, 9, 10, 6),
+        (3, 4, 1, 10, 8, 7),
+    ),
+    8: (
+        (1, 2, 3, 4),
+        (5, 8, 7, 6),
+        (1, 5, 6, 2),
+        (2, 6, 7, 3),
+        (3, 7, 8, 4),
+        (4, 8, 5, 1),
+    ),
+    20: (
+        (1, 2, 3, 4, 9, 10, 11, 12),
+        (5, 8, 7, 6, 16, 15, 14, 13),
+        (1, 5, 6, 2, 17, 13, 18, 9),
+        (2, 6, 7, 3, 18, 14, 19, 10),
+        (3, 7, 8, 4, 19, 15, 20, 11),
+        (4, 8, 5, 1, 20, 16, 17, 12),
+    ),
+}
+
+
+class IdLookup:
+    """Vectorized map from Abaqus ids (nodes, elements) to array rows.
+
+    Contiguous ids are resolved with an offset, ids with small gaps with a dense
+    table and scattered ids with a binary search over the sorted ids.
+    """
+
+    def __init__(self, ids: npt.NDArray[np.int64]) -> None:
+        self.ids = ids
+        self.size = len(ids)
+        self.first = int(ids.min()) if self.size else 0
+        span = int(ids.max()) - self.first + 1 if self.size else 0
+
+        self.method = "offset"
+        if span != self.size or np.any(np.diff(ids) != 1):
+            self.method = "dense" if span <= DENSE_SPAN_FACTOR * self.size else "search"
+
+        if self.method == "dense":
+            self.table = np.full(span, -1, dtype=np.int64)
+            self.table[ids - self.first] = np.arange(self.size)
+        elif self.method == "search":
+            self.order = np.argsort(ids, kind="stable")
+            self.sorted_ids = ids[self.order]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def rows(self, ids: npt.ArrayLike) -> npt.NDArray[np.int64]:
+        """Return the row of each id
+
+        Args:
+            ids (npt.ArrayLike): ids to look up, any shape
+
+        Raises:
+            KeyError: if any id is not present
+
+        Returns:
+            npt.NDArray[np.int64]: rows with the same shape as ids
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.size == 0:
+            if ids.size:
+                raise KeyError(f"Ids not found: {ids.ravel()[:10]}")
+            return ids
+
+        if self.method == "offset":
+            rows = ids - self.first
+            found = (rows >= 0) & (rows < self.size)
+
+        elif self.method == "dense":
+            position = ids - self.first
+            found = (position >= 0) & (position < len(self.table))
+            rows = np.where(found, self.table[np.where(found, position, 0)], -1)
+            found &= rows >= 0
+
+        else:
+            position = np.searchsorted(self.sorted_ids, ids)
+            position = np.minimum(position, self.size - 1)
+            found = self.sorted_ids[position] == ids
+            rows = self.order[position]
+
+        if not np.all(found):
+            raise KeyError(f"Ids not found: {ids[~found][:10]}")
+        return rows
+
+
+class NodeTable:
+    """Node ids and coordinates of one or more *NODE blocks"""
+
+    def __init__(
+        self, ids: npt.NDArray[np.int64], coordinates: npt.NDArray[np.floating]
+    ) -> None:
+        self.ids = ids
+        self.coordinates = coordinates
+        self.lookup = IdLookup(ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, node_ids: npt.ArrayLike) -> npt.NDArray[np.floating]:
+        """Return the coordinates of the given node ids, one row per id"""
+        return self.coordinates[self.lookup.rows(node_ids)]
+
+    def bounding_box(
+        self, node_ids: npt.ArrayLike | None = None
+    ) -> tuple[npt.NDArray[np.floating], npt.NDArray[np.floating]]:
+        """Return the minimum and maximum corner of the given nodes (all nodes if None)"""
+        coordinates = self.coordinates if node_ids is None else self.get(node_ids)
+        return coordinates.min(axis=0), coordinates.max(axis=0)
+
+
+def columns_of(data: bytes) -> int:
+    """Number of values on the first data line of a block, ** comments skipped"""
+    data = strip_comments(data).lstrip()
+    end = data.find(b"\n")
+    first_line = data if end == -1 else data[:end]
+    return len([value for value in first_line.split(b",") if value.strip()])
+
+
+def parse_nodes(blocks: list[bytes], dtype: npt.DTypeLike = np.float64) -> NodeTable:
+    """Parse the data lines of *NODE blocks in bulk
+
+    Args:
+        blocks (list[bytes]): data lines of each *NODE block
+        dtype (npt.DTypeLike, optional): dtype of the coordinates, np.float32 halves
+            the memory. Defaults to np.float64.
+
+    Returns:
+        NodeTable: ids and (N, 3) coordinates in file order
+    """
+    ids: list[npt.NDArray[np.int64]] = []
+    coordinates: list[npt.NDArray[np.floating]] = []
+    for data in blocks:
+        data = strip_comments(data)
+        if not data.strip():
+            continue
+        values = text_to_array(data, np.float64).reshape(-1, columns_of(data))
+        ids.append(values[:, 0].astype(np.int64))
+        coordinates.append(values[:, 1:].astype(dtype))
+
+    if not ids:
+        return NodeTable(np.empty(0, np.int64), np.empty((0, 3), dtype))
+    return NodeTable(np.concatenate(ids), np.concatenate(coordinates))
+
+
+def nodes_per_element(element_type: str, data: bytes | None = None) -> int:
+    """Number of nodes of an element type
+
+    Args:
+        element_type (str): Abaqus element type, e.g. "DC3D4"
+        data (bytes | None, optional): data lines of a block of this type. The width
+            of its first row gives the node count of types missing from
+            element_node_counts. Defaults to None.
+
+    Raises:
+        ValueError: if the type is unknown and no data is given
+    """
+    num_nodes = element_node_counts.get(element_type.upper())
+    if num_nodes is not None:
+        return num_nodes
+    if data is not None and columns_of(data) > 1:
+        return columns_of(data) - 1
+    raise ValueError(f"Unknown number of nodes for element type {element_type}")
+
+
+def face_table(element_type: str) -> npt.NDArray[np.intp]:
+    """Return the zero based connectivity columns of each face of an element type
+
+    Returns:
+        npt.NDArray[np.intp]: (number of faces, nodes per face), row i is face S{i + 1}
+    """
+    num_nodes = nodes_per_element(element_type)
+    if "3D" not in element_type or num_nodes not in face_definitions:
+        raise ValueError(f"Faces of element type {element_type} are not supported")
+    return np.array(face_definitions[num_nodes], dtype=np.intp) - 1
+
+
+def index_dtype(max_id: int) -> type[np.signedinteger]:
+    """Smallest integer dtype that holds the given id"""
+    return np.int32 if max_id < np.iinfo(np.int32).max else np.int64
+
+
+class ElementTable:
+    """Elements of one type with a fixed width connectivity row per element"""
+
+    def __init__(
+        self,
+        element_type: str,
+        ids: npt.NDArray[np.int64],
+        connectivity: npt.NDArray[np.signedinteger],
+    ) -> None:
+        self.element_type = element_type
+        self.ids = ids
+        self.connectivity = connectivity
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class Connectivity:
+    """Element connectivity of a mesh, stored as one ElementTable per element type.
+    Element ids are mapped to a global row, which follows the order of the tables.
+    """
+
+    def __init__(self, tables: dict[str, ElementTable]) -> None:
+        self.tables = tables
+        self.type_names = list(tables)
+        tables_list = list(tables.values())
+
+        self.local_rows: npt.NDArray[np.int64] | None = None
+        if len(tables_list) == 1:
+            # Global rows are the table rows, which also keeps memory mapped ids as is
+            self.ids = tables_list[0].ids
+            self.type_codes = np.zeros(len(self.ids), np.int8)
+        else:
+            self.ids = np.concatenate(
+                [table.ids for table in tables_list] or [np.empty(0, np.int64)]
+            )
+            self.type_codes = np.concatenate(
+                [
+                    np.full(len(table), code, np.int8)
+                    for code, table in enumerate(tables_list)
+                ]
+                or [np.empty(0, np.int8)]
+            )
+            self.local_rows = np.concatenate(
+                [np.arange(len(table)) for table in tables_list]
+                or [np.empty(0, np.int64)]
+            )
+        self.lookup = IdLookup(self.ids)
+        self.csr_arrays: (
+            tuple[npt.NDArray[np.int64], npt.NDArray[np.signedinteger]] | None
+        ) = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def csr(self) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.signedinteger]]:
+        """Return the connectivity of all element types in CSR layout
+
+        Returns:
+            npt.NDArray[np.int64]: offsets, the nodes of global row i are
+                indices[offsets[i]:offsets[i + 1]]
+            npt.NDArray[np.signedinteger]: node ids of every element
+        """
+        if self.csr_arrays is None:
+            widths = np.concatenate(
+                [np.zeros(1, np.int64)]
+                + [
+                    np.full(len(table), table.connectivity.shape[1], np.int64)
+                    for table in self.tables.values()
+                ]
+            )
+            indices = np.concatenate(
+                [table.connectivity.ravel() for table in self.tables.values()]
+                or [np.empty(0, np.int32)]
+            )
+            self.csr_arrays = (np.cumsum(widths), indices)
+        return self.csr_arrays
+
+    def to_local(self, rows: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        """Convert global rows to rows of their ElementTable"""
+        return rows if self.local_rows is None else self.local_rows[rows]
+
+    def group_by_type(
+        self, element_ids: npt.ArrayLike
+    ) -> dict[str, npt.NDArray[np.int64]]:
+        """Return the rows of the given elements in their ElementTable, by element type"""
+        rows = self.lookup.rows(np.ravel(element_ids))
+        codes = self.type_codes[rows]
+        return {
+            self.type_names[code]: self.to_local(rows[codes == code])
+            for code in np.unique(codes)
+        }
+
+    def nodes_of(self, element_ids: npt.ArrayLike) -> npt.NDArray[np.signedinteger]:
+        """Return the sorted unique node ids used by the given elements"""
+        nodes = [
+            self.tables[element_type].connectivity[rows].ravel()
+            for element_type, rows in self.group_by_type(element_ids).items()
+        ]
+        if not nodes:
+            return np.empty(0, np.int64)
+        return np.unique(np.concatenate(nodes))
+
+    def face_nodes(
+        self,
+        element_ids: npt.ArrayLike,
+        face_numbers: npt.ArrayLike,
+        groups: npt.ArrayLike,
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """Resolve element faces to nodes for many faces, and many surfaces, at once
+
+        Args:
+            element_ids (npt.ArrayLike): element of each face
+            face_numbers (npt.ArrayLike): face number of each face, 1 for S1
+            groups (npt.ArrayLike): group (e.g. surface) of each face
+
+        Returns:
+            npt.NDArray[np.int64]: group of each (group, node) pair, sorted
+            npt.NDArray[np.int64]: node ids, unique within each group
+        """
+        element_ids = np.ravel(element_ids)
+        face_rows = np.ravel(face_numbers).astype(np.intp) - 1
+        groups = np.ravel(groups).astype(np.int64)
+        rows = self.lookup.rows(element_ids)
+        codes = self.type_codes[rows]
+
+        group_parts: list[npt.NDArray[np.int64]] = []
+        node_parts: list[npt.NDArray[np.int64]] = []
+        for code in np.unique(codes):
+            table = self.tables[self.type_names[code]]
+            faces = face_table(table.element_type)
+            selected = codes == code
+            selected_faces = face_rows[selected]
+            if np.any((selected_faces < 0) | (selected_faces >= len(faces))):
+                raise ValueError(
+                    f"Face numbers out of range for element type {table.element_type}"
+                )
+
+            local_rows = self.to_local(rows[selected])
+            nodes = table.connectivity[local_rows[:, None], faces[selected_faces]]
+            node_parts.append(nodes.ravel().astype(np.int64))
+            group_parts.append(np.repeat(groups[selected], faces.shape[1]))
+
+        if not node_parts:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+
+        nodes = np.concatenate(node_parts)
+        stride = int(nodes.max()) + 1
+        pairs = np.unique(np.concatenate(group_parts) * stride + nodes)
+        return pairs // stride, pairs % stride
+
+
+def parse_elements(blocks: list[tuple[str, bytes]]) -> Connectivity:
+    """Parse the data lines of *Element blocks in bulk
+
+    Args:
+        blocks (list[tuple[str, bytes]]): element type and data lines of each block
+
+    Returns:
+        Connectivity: one fixed width table per element type
+    """
+    parsed: dict[str, list[npt.NDArray[np.int64]]] = {}
+    for element_type, data in blocks:
+        data = strip_comments(data)
+        if not data.strip():
+            continue
+        values = text_to_array(data, np.int64)
+        parsed.setdefault(element_type, []).append(
+            values.reshape(-1, nodes_per_element(element_type, data) + 1)
+        )
+
+    tables: dict[str, ElementTable] = {}
+    for element_type, arrays in parsed.items():
+        values = np.concatenate(arrays)
+        connectivity = values[:, 1:]
+        tables[element_type] = ElementTable(
+            element_type,
+            values[:, 0],
+            connectivity.astype(index_dtype(int(connectivity.max(initial=0)))),
+        )
+    return Connectivity(tables)
+
+
+class NodeElementIndex:
+    """Inverse adjacency of a mesh in CSR layout: the elements attached to node_ids[i]
+    are element_ids[offsets[i]:offsets[i + 1]]
+    """
+
+    def __init__(
+        self,
+        node_ids: npt.NDArray[np.signedinteger],
+        offsets: npt.NDArray[np.int64],
+        element_ids: npt.NDArray[np.signedinteger],
+    ) -> None:
+        self.node_ids = node_ids
+        self.offsets = offsets
+        self.element_ids = element_ids
+        self.lookup = IdLookup(node_ids.astype(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def counts(self) -> npt.NDArray[np.int64]:
+        """Number of elements attached to each node"""
+        return np.diff(self.offsets)
+
+    def elements_of(self, node_ids: npt.ArrayLike) -> npt.NDArray[np.signedinteger]:
+        """Return the sorted unique ids of the elements that touch any of the nodes"""
+        rows = self.lookup.rows(np.ravel(node_ids))
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        # Position of every entry of the selected CSR rows, without a Python loop
+        positions = np.repeat(
+            starts - np.cumsum(lengths) + lengths, lengths
+        ) + np.arange(lengths.sum())
+        return np.unique(self.element_ids[positions])
+
+
+def radix_argsort(keys: npt.NDArray[np.signedinteger]) -> npt.NDArray[np.intp]:
+    """Stable argsort of non-negative integer keys in O(n), sorting 16 bits at a time
+    (NumPy uses a radix sort for 16 bit keys and a merge sort for wider keys)
+    """
+    if len(keys) == 0 or keys.min() < 0 or keys.max() >= 1 << 32:
+        return np.argsort(keys, kind="stable")
+
+    order = np.argsort((keys & 0xFFFF).astype(np.uint16), kind="stable")
+    if keys.max() >= 1 << 16:
+        high = (keys[order] >> 16).astype(np.uint16)
+        order = order[np.argsort(high, kind="stable")]
+    return order
+
+
+def build_node_elements(connectivity: Connectivity) -> NodeElementIndex:
+    """Invert the connectivity into a node to element index
+
+    Args:
+        connectivity (Connectivity): element connectivity of the mesh
+
+    Returns:
+        NodeElementIndex: elements attached to each node referenced by the mesh
+    """
+    offsets, indices = connectivity.csr()
+    element_of_entry = np.repeat(connectivity.ids, np.diff(offsets))
+    order = radix_argsort(indices)
+    sorted_nodes = indices[order]
+
+    first = np.ones(len(sorted_nodes), dtype=bool)
+    first[1:] = sorted_nodes[1:] != sorted_nodes[:-1]
+    starts = np.flatnonzero(first)
+
+    element_ids = element_of_entry[order]
+    return NodeElementIndex(
+        sorted_nodes[starts],
+        np.append(starts, len(sorted_nodes)).astype(np.int64),
+        element_ids.astype(index_dtype(int(element_ids.max(initial=0)))),
+    )
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from typing import Iterable, NotRequired, TypedDict
+import numpy as np
+from loguru import logger
+from .edit_functions.TemplateEditFunction import TemplateEditFunction
+from .keyword_index import build_index
+
+MANIFEST_VERSION = 2
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+class output_manifest(TypedDict):
+    version: int
+    key: str  # Hash of everything below, compared on reruns
+    source_hash: str
+    inputs: dict[str, str]  # Hash of each other input file, e.g. the orientation file
+    edit_functions: list[str]  # Qualified class name of each edit function
+    writer: dict[str, object]  # Options of the writer, e.g. the break point
+    # Size and modification time of the output when the manifest was saved, so an
+    # output changed or replaced since then is not taken as current
+    output_size: NotRequired[int]
+    output_mtime_ns: NotRequired[int]
+
+
+def update_hash(hasher: "hashlib._Hash", value: object) -> None:
+    """Feed a nested configuration into a hash in a stable way. Arrays are hashed by
+    dtype, shape and content, dicts by sorted key and sets as sorted lists."""
+    if isinstance(value, np.ndarray):
+        hasher.update(f"ndarray:{value.dtype.str}:{value.shape}:".encode())
+        hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        hasher.update(b"dict:")
+        for key in sorted(value, key=str):
+            update_hash(hasher, str(key))
+            update_hash(hasher, value[key])
+    elif isinstance(value, (set, frozenset)):
+        # Iteration order of sets of strings changes between interpreter runs
+        update_hash(hasher, sorted(value, key=repr))
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"{type(value).__name__}:{len(value)}:".encode())
+        for item in value:
+            update_hash(hasher, item)
+    elif isinstance(value, np.generic):
+        update_hash(hasher, value.item())
+    else:
+        hasher.update(f"{type(value).__name__}:{value!r};".encode())
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def manifest_path(output_file: str) -> str:
+    return f"{output_file}{MANIFEST_SUFFIX}"
+
+
+def new_manifest(
+    source_file: str,
+    edit_functions: Iterable[TemplateEditFunction],
+    inputs: dict[str, str] | None = None,
+    writer: dict[str, object] | None = None,
+) -> output_manifest:
+    """Describe an output by the content of its inputs and the edits applied to it
+
+    Args:
+        source_file (str): path of the input file, its hash comes from the keyword index
+            sidecar, so unchanged inputs are not read again
+        edit_functions (Iterable[TemplateEditFunction]): edit functions, before use
+        inputs (dict[str, str] | None, optional): hash of each other input, e.g. the
+            orientation file. Defaults to None.
+        writer (dict[str, object] | None, optional): writer options that change the
+            output. Defaults to None.
+
+    Returns:
+        output_manifest: manifest with the combined key
+    """
+    configs = [func.config() for func in edit_functions]
+    manifest: output_manifest = {
+        "version": MANIFEST_VERSION,
+        "key": "",
+        "source_hash": build_index(source_file)["signature"]["hash"],
+        "inputs": inputs or {},
+        "edit_functions": [str(config["class"]) for config in configs],
+        "writer": writer or {},
+    }
+    hasher = hashlib.sha256()
+    update_hash(
+        hasher,
+        [
+            manifest["version"],
+            manifest["source_hash"],
+            manifest["inputs"],
+            configs,
+            manifest["writer"],
+        ],
+    )
+    manifest["key"] = hasher.hexdigest()
+    return manifest
+
+
+def is_current(output_file: str, manifest: output_manifest) -> bool:
+    """True if the output was written from the same inputs and edits and is unchanged
+    since, same size and modification time as when its manifest was saved"""
+    try:
+        stat = os.stat(output_file)
+        with open(manifest_path(output_file), "r") as file:
+            stored: output_manifest = json.load(file)
+    except (OSError, ValueError):
+        return False
+    return (
+        stored.get("key") == manifest["key"]
+        and stored.get("output_size") == stat.st_size
+        and stored.get("output_mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def discard_manifest(output_file: str) -> None:
+    """Remove the manifest of an output before the output is rewritten, so an output
+    left incomplete by a failed run is never taken as current"""
+    try:
+        os.remove(manifest_path(output_file))
+    except FileNotFoundError:
+        pass
+
+
+def save_manifest(output_file: str, manifest: output_manifest) -> None:
+    """Store the manifest next to an output once the output is completely written"""
+    try:
+        stat = os.stat(output_file)
+        manifest = {
+            **manifest,
+            "output_size": stat.st_size,
+            "output_mtime_ns": stat.st_mtime_ns,
+        }
+        with open(manifest_path(output_file), "w") as file:
+            json.dump(manifest, file, indent=1)
+    except OSError as e:
+        logger.warning(f"Could not write the manifest of {output_file}: {e}")
@@ -0,0 +1,189 @@
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+from multiprocessing import shared_memory
+import numpy as np
+import numpy.typing as npt
+from ..data_parsing import text_to_array
+from .keyword_index import count_comment_lines, count_newlines
+
+# Blocks smaller than this are parsed in the calling process
+MIN_PARALLEL_BYTES = 1 << 26
+# Each worker gets about this many chunks, so uneven chunks still balance out
+CHUNKS_PER_WORKER = 4
+
+
+byte_range = tuple[str, int, int]  # (file path, start, stop)
+
+
+def split_ranges(
+    ranges: list[byte_range], num_chunks: int
+) -> tuple[list[byte_range], list[int]]:
+    """Split byte ranges into chunks that start and end on line boundaries and count
+    the lines of each chunk on a memory map of the file
+
+    Args:
+        ranges (list[byte_range]): (file path, start, stop) of the data lines of each block
+        num_chunks (int): number of chunks to aim for over all ranges
+
+    Returns:
+        list[byte_range]: (file path, start, stop) of each chunk, in the order of the ranges
+        list[int]: number of data lines of each chunk, a last line without a newline
+            included and ** comment lines left out
+    """
+    total = sum(stop - start for _, start, stop in ranges)
+    chunk_size = max(total // max(num_chunks, 1), 1)
+    chunks: list[byte_range] = []
+    counts: list[int] = []
+    for file_path, start, stop in ranges:
+        if start >= stop:
+            continue
+        with open(file_path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buffer:
+            while start < stop:
+                end = min(start + chunk_size, stop)
+                if end < stop:
+                    newline = buffer.find(b"\n", end, stop)
+                    end = stop if newline == -1 else newline + 1
+                chunks.append((file_path, start, end))
+                counts.append(
+                    count_newlines(buffer, start, end)
+                    + (0 if buffer[end - 1 : end] == b"\n" else 1)
+                    - count_comment_lines(buffer, start, end)
+                )
+                start = end
+    return chunks, counts
+
+
+def read_range(file_path: str, start: int, stop: int) -> bytes:
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        return file.read(stop - start)
+
+
+def parse_chunk(
+    file_path: str,
+    start: int,
+    stop: int,
+    first_row: int,
+    columns: int,
+    ids_name: str,
+    values_name: str,
+    shape: tuple[int, int],
+    dtype: str,
+) -> int:
+    """Parse one chunk and write it straight into the shared id and value arrays
+
+    Returns:
+        int: number of rows parsed
+    """
+    values = text_to_array(read_range(file_path, start, stop), np.float64)
+    if len(values) % columns:
+        raise ValueError(f"Chunk {start}-{stop} of {file_path} has incomplete rows")
+    rows = values.reshape(-1, columns)
+    if dtype.startswith("int") and rows.size and rows.max() > np.iinfo(dtype).max:
+        raise ValueError(f"Values of chunk {start}-{stop} overflow {dtype}")
+
+    ids_memory, values_memory = (
+        shared_memory.SharedMemory(name=ids_name),
+        shared_memory.SharedMemory(name=values_name),
+    )
+    try:
+        ids = np.ndarray((shape[0],), dtype=np.int64, buffer=ids_memory.buf)
+        values = np.ndarray(shape, dtype=dtype, buffer=values_memory.buf)
+        ids[first_row : first_row + len(rows)] = rows[:, 0]
+        values[first_row : first_row + len(rows)] = rows[:, 1:]
+        del ids, values
+    finally:
+        ids_memory.close()
+        values_memory.close()
+    return len(rows)
+
+
+class SharedArrays:
+    """Ids and values of parsed rows backed by shared memory. The arrays stay valid as
+    long as this object is referenced; close releases the memory once they are unused.
+    """
+
+    def __init__(self, rows: int, columns: int, dtype: npt.DTypeLike) -> None:
+        dtype = np.dtype(dtype)
+        self.ids_memory = shared_memory.SharedMemory(create=True, size=max(rows * 8, 1))
+        self.values_memory = shared_memory.SharedMemory(
+            create=True, size=max(rows * columns * dtype.itemsize, 1)
+        )
+        self.ids = np.ndarray((rows,), dtype=np.int64, buffer=self.ids_memory.buf)
+        self.values = np.ndarray(
+            (rows, columns), dtype=dtype, buffer=self.values_memory.buf
+        )
+
+    def unlink(self) -> None:
+        """Remove the names of the segments, the mappings of this process stay valid"""
+        self.ids_memory.unlink()
+        self.values_memory.unlink()
+
+    def close(self) -> None:
+        self.ids = self.values = None  # type: ignore
+        try:
+            self.ids_memory.close()
+            self.values_memory.close()
+        except BufferError:
+            # Arrays handed out are still referenced, the memory is freed with them
+            pass
+
+
+def parse_rows_parallel(
+    ranges: list[byte_range],
+    columns: int,
+    dtype: npt.DTypeLike,
+    workers: int,
+) -> SharedArrays:
+    """Parse one record per line data blocks (e.g. *NODE, *Element) with a process pool
+
+    The ranges are split at newline boundaries and their lines counted up front, so
+    each worker parses its chunks straight into its rows of one shared array and the
+    result is assembled without pickling or concatenating the parsed chunks.
+
+    Args:
+        ranges (list[byte_range]): (file path, start, stop) of the data lines of each block
+        columns (int): values per line, the id included
+        dtype (npt.DTypeLike): dtype of the values after the id
+        workers (int): number of worker processes
+
+    Returns:
+        SharedArrays: ids and (rows, columns - 1) values
+
+    Raises:
+        ValueError: if a chunk does not hold exactly one record per line, e.g. blank
+            lines or records continued on the next line
+    """
+    chunks, counts = split_ranges(ranges, workers * CHUNKS_PER_WORKER)
+    first_rows = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+    shape = (int(first_rows[-1]), columns - 1)
+    # Created before the pool starts, so the workers share the resource tracker
+    arrays = SharedArrays(shape[0], shape[1], dtype)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    parse_chunk,
+                    file_path,
+                    start,
+                    stop,
+                    int(first_row),
+                    columns,
+                    arrays.ids_memory.name,
+                    arrays.values_memory.name,
+                    shape,
+                    np.dtype(dtype).name,
+                )
+                for (file_path, start, stop), first_row in zip(chunks, first_rows)
+            ]
+            for future, count in zip(futures, counts):
+                if future.result() != count:
+                    raise ValueError("Data lines do not hold one record per line")
+    except Exception:
+        arrays.unlink()
+        arrays.close()
+        raise
+    arrays.unlink()
+    return arrays
@@ -0,0 +1,81 @@
+import re
+import numpy as np
+import numpy.typing as npt
+from .keyword_index import index_entry
+
+# Instance names end with a separator and a number, e.g. Fiber_812 or Ori-Fiber-812
+instance_re = re.compile(r"^(.+?)[_-](\d+)$")
+
+registry_keywords = ("Elset", "SolidSection", "Orientation")
+
+
+class PhaseRegistry:
+    """Elsets, Solid Sections and Orientations grouped by phase and instance number.
+
+    Built in one pass over the keyword index, so listing every instance of a phase or
+    finding the section of an instance are dictionary lookups.
+    """
+
+    def __init__(self, entries: list[index_entry]) -> None:
+        instances: dict[str, dict[str, list[tuple[int, str]]]] = {
+            keyword: {} for keyword in registry_keywords
+        }
+        self.names: dict[str, set[str]] = {
+            keyword: set() for keyword in registry_keywords
+        }
+        self.sections: dict[str, index_entry] = {}
+        self.orientations: dict[str, index_entry] = {}
+
+        for entry in entries:
+            keyword = entry["keyword"]
+            if keyword not in instances:
+                continue
+            name = entry["name"]
+            self.names[keyword].add(name)
+            if keyword == "SolidSection":
+                self.sections[name] = entry
+            elif keyword == "Orientation":
+                self.orientations[name] = entry
+
+            match = instance_re.match(name)
+            if match is not None:
+                instances[keyword].setdefault(match.group(1), []).append(
+                    (int(match.group(2)), name)
+                )
+
+        self.instances: dict[str, dict[str, npt.NDArray[np.int64]]] = {}
+        self.instance_name_lists: dict[str, dict[str, list[str]]] = {}
+        for keyword, phases in instances.items():
+            self.instances[keyword] = {}
+            self.instance_name_lists[keyword] = {}
+            for phase, numbered in phases.items():
+                numbered = sorted(set(numbered))
+                self.instances[keyword][phase] = np.array(
+                    [number for number, _ in numbered], dtype=np.int64
+                )
+                self.instance_name_lists[keyword][phase] = [
+                    name for _, name in numbered
+                ]
+
+    def phases(self, keyword: str = "Elset") -> list[str]:
+        """Phase names: prefixes of numbered instances and names without a number"""
+        prefixes = set(self.instances[keyword])
+        plain = {name for name in self.names[keyword] if not instance_re.match(name)}
+        return sorted(prefixes | plain)
+
+    def instance_numbers(
+        self, phase: str, keyword: str = "Elset"
+    ) -> npt.NDArray[np.int64]:
+        """Sorted instance numbers of a phase, e.g. [0, 1, ...] for Fiber_0, Fiber_1, ..."""
+        return self.instances[keyword].get(phase, np.empty(0, np.int64))
+
+    def instance_names(self, phase: str, keyword: str = "Elset") -> list[str]:
+        """Names of the instances of a phase, ordered by instance number"""
+        return self.instance_name_lists[keyword].get(phase, [])
+
+    def section(self, elset: str) -> index_entry | None:
+        """Solid Section entry assigned to an elset, e.g. the section of Fiber_812"""
+        return self.sections.get(elset)
+
+    def orientation(self, name: str) -> index_entry | None:
+        return self.orientations.get(name)
@@ -0,0 +1,168 @@
+from queue import Queue
+from threading import Event, Thread
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+"""
+Reader and writer threads that overlap file I/O with the editing done in the calling
+thread. Both threads spend most of their time in read and write system calls, which
+release the GIL, so the latency of each operation (e.g. on a network filesystem) is
+hidden behind the Python work of the calling thread.
+"""
+
+# Characters per block read by the reader thread and per buffer of the writer thread
+PIPELINE_BLOCK_SIZE = 1 << 22
+# Blocks each queue holds before the producing side waits
+PIPELINE_DEPTH = 4
+
+
+def read_blocks(file: TextIO, queue: Queue, stop: Event, block_size: int) -> None:
+    try:
+        while not stop.is_set():
+            block = file.read(block_size)
+            queue.put(block)
+            if not block:
+                return
+    except Exception as e:
+        queue.put(e)
+
+
+def read_line_blocks(
+    file: TextIO, block_size: int = PIPELINE_BLOCK_SIZE, depth: int = PIPELINE_DEPTH
+) -> Iterator[str]:
+    """Iterate over blocks of whole lines of a text file from its current position,
+    while a reader thread reads the following blocks ahead
+
+    Args:
+        file (TextIO): file opened in text mode
+        block_size (int, optional): characters per read. Defaults to PIPELINE_BLOCK_SIZE.
+        depth (int, optional): blocks read ahead at most. Defaults to PIPELINE_DEPTH.
+
+    Yields:
+        str: blocks that end with "\n", except a last line without line ending
+    """
+    queue: Queue[str | Exception] = Queue(maxsize=depth)
+    stop = Event()
+    reader = Thread(
+        target=read_blocks, args=(file, queue, stop, block_size), daemon=True
+    )
+    reader.start()
+    pending = ""
+    try:
+        while block := queue.get():
+            if isinstance(block, Exception):
+                raise block
+            end = block.rfind("\n") + 1
+            if end == 0:
+                pending += block
+                continue
+            yield pending + block[:end]
+            pending = block[end:]
+        if pending:
+            yield pending
+    finally:
+        # The reader is blocked on a full queue at most once more before it sees stop
+        stop.set()
+        while reader.is_alive():
+            while not queue.empty():
+                queue.get_nowait()
+            reader.join(timeout=0.01)
+
+
+def read_lines(
+    file: TextIO, block_size: int = PIPELINE_BLOCK_SIZE, depth: int = PIPELINE_DEPTH
+) -> Iterator[str]:
+    """Iterate over the lines of a text file as read by read_line_blocks. Lines are
+    split on "\n" only, so they are the same as iterating over the file."""
+    blocks = read_line_blocks(file, block_size, depth)
+    try:
+        for block in blocks:
+            lines = block.split("\n")
+            last = lines.pop()
+            for line in lines:
+                yield f"{line}\n"
+            if last:
+                yield last
+    finally:
+        blocks.close()  # type: ignore
+
+
+class BackgroundWriter:
+    """Text sink whose buffers are encoded and written by a writer thread
+
+    write and writelines collect text until PIPELINE_BLOCK_SIZE characters are pending,
+    then hand them to the writer thread through a bounded queue. Writes keep their
+    order and "\n" is written as newline, so the target receives the same bytes as
+    from direct writes to a text file opened with that line ending.
+    """
+
+    def __init__(
+        self,
+        target: BinaryIO,
+        encoding: str,
+        block_size: int = PIPELINE_BLOCK_SIZE,
+        depth: int = PIPELINE_DEPTH,
+        newline: str = "\n",
+    ) -> None:
+        self.target = target
+        self.encoding = encoding
+        self.newline = newline
+        self.block_size = block_size
+        self.pending: list[str] = []
+        self.pending_size = 0
+        self.error: Exception | None = None
+        self.queue: Queue[str | None] = Queue(maxsize=depth)
+        self.writer = Thread(target=self.write_blocks, daemon=True)
+        self.writer.start()
+
+    def write_blocks(self) -> None:
+        while (block := self.queue.get()) is not None:
+            if self.error is not None:
+                continue  # Keep draining, so the producer never blocks
+            try:
+                if self.newline != "\n":
+                    block = block.replace("\n", self.newline)
+                self.target.write(block.encode(self.encoding))
+            except Exception as e:
+                self.error = e
+
+    def write(self, text: str) -> None:
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.block_size:
+            self.flush()
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        """Hand the pending text to the writer thread"""
+        if self.error is not None:
+            raise self.error
+        if self.pending:
+            self.queue.put("".join(self.pending))
+            self.pending.clear()
+            self.pending_size = 0
+
+    def close(self) -> None:
+        """Write the pending text and wait until the writer thread is done"""
+        try:
+            self.flush()
+        finally:
+            self.queue.put(None)
+            self.writer.join()
+        if self.error is not None:
+            raise self.error
+        self.target.flush()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if exc_info[0] is None:
+            self.close()
+        else:
+            # Stop the thread without hiding the original exception
+            self.pending.clear()
+            self.queue.put(None)
+            self.writer.join()
@@ -1,20 +1,65 @@
-from typing import Literal, TypedDict
-from io import TextIOWrapper
+from typing import Iterator, Literal, TypedDict
+from io import BufferedReader, TextIOWrapper
+import os
+import time
+import numpy as np
+import numpy.typing as npt
 from loguru import logger
-from ..data_parsing import line_to_list
+from ..compressed_io import is_compressed, open_binary, open_text
+from ..data_parsing import iter_text_arrays, line_to_list
+from .binary_cache import (
+    is_unchanged,
+    load_manifest,
+    load_mesh_cache,
+    save_mesh_cache,
+)
+from .keyword_index import (
+    INDEX_VERSION,
+    build_index,
+    build_logical_index,
+    file_signature,
+    index_entry,
+    keyword_index,
+)
+from .mesh import (
+    Connectivity,
+    ElementTable,
+    NodeElementIndex,
+    NodeTable,
+    build_node_elements,
+    columns_of,
+    nodes_per_element,
+    parse_elements,
+    parse_nodes,
+)
+from .parallel import MIN_PARALLEL_BYTES, SharedArrays, parse_rows_parallel
+from .phases import PhaseRegistry
+from .sets import (
+    SetMembers,
+    generate_ranges,
+    parse_explicit,
+    parse_generate,
+    union,
+)
 
 
 class keyword_info(TypedDict):
     start_line: int
+    offset: int
+    length: int
 
 
 class set_info(TypedDict):
     start_line: int
+    offset: int
+    length: int
     generate: bool
 
 
 KeywordName = str  # The name of the keyword_info
 
+set_keywords = Literal["Elset", "Nset"]
+
 keywords = Literal[
     "Surface",
     "Elset",
@@ -37,34 +82,35 @@ class cache_type(TypedDict):
 
 
 def organize_key(
-    param_list: list[str], line_no: int
+    param_list: list[str], line_no: int, offset: int = 0, length: int = 0
 ) -> tuple[str, set_info | keyword_info] | None:
     keyword: str = param_list[0]
+    info: keyword_info = {"start_line": line_no, "offset": offset, "length": length}
     if keyword == "*Surface":
         name = param_list[2].split("=")[1]
-        return (name, {"start_line": line_no})
+        return (name, info)
 
     if keyword in ["*Elset", "*Nset"]:
         name = param_list[1].split("=")[1]
         generate = False
         if "generate" in param_list:
             generate = True
-        return (name, {"start_line": line_no, "generate": generate})
+        return (name, {**info, "generate": generate})
 
     if keyword == "*NODE":
         name = param_list[1].split("=")[1]
-        return (name, {"start_line": line_no})
+        return (name, info)
 
     if keyword == "*Element":
         name = param_list[2].split("=")[1]
-        return (name, {"start_line": line_no})
+        return (name, info)
 
     if keyword == "*Orientation":
         name = param_list[1].split("=")[1]
-        return (name, {"start_line": line_no})
+        return (name, info)
     if keyword == "*SolidSection":
         name = param_list[1].split("=")[1]
-        return (name, {"start_line": line_no})
+        return (name, info)
 
     else:
         logger.warning(
@@ -80,10 +126,29 @@ class AbaqusInputFileError(Exception):
 
 
 class AbaqusInputFile:
-    def __init__(self, filename: str, path: str):
+    def __init__(
+        self,
+        filename: str,
+        path: str,
+        use_sidecar: bool = True,
+        follow_includes: bool = True,
+    ):
         self.filename = filename
         self.path = path
+        self.file_path = f"{self.path}/{self.filename}"
+        self.use_sidecar = use_sidecar
+        self.follow_includes = follow_includes
         self.file = self.open_file()
+        self.binary_files: dict[str, BufferedReader] = {}
+        self.index: list[index_entry] = []
+        self.keyword_lookup: dict[tuple[str, str | None], list[index_entry]] = {}
+        self.node_tables: dict[tuple[str | None, str], NodeTable] = {}
+        self.connectivity: dict[str | None, Connectivity] = {}
+        self.sets: dict[tuple[str, str], SetMembers] = {}
+        self.signature: file_signature | None = None
+        self.node_element_index: NodeElementIndex | None = None
+        self.phases: PhaseRegistry | None = None
+        self.shared_arrays: list[SharedArrays] = []
         self.cache: cache_type = {
             "Surface": {},
             "NODE": {},
@@ -96,9 +161,10 @@ class AbaqusInputFile:
         self.phase_name_list: list[str] = []
 
     def open_file(self) -> TextIOWrapper:
-        """Open the Abaqus input file and return the file object."""
+        """Open the Abaqus input file and return the file object. .inp.gz and .inp.zst
+        files are decompressed while they are read."""
         try:
-            file = open(f"{self.path}/{self.filename}", "r")
+            file = open_text(self.file_path, "r")
             logger.info(f"Opened Abaqus input file: {self.filename}")
             return file
         except FileNotFoundError:
@@ -106,29 +172,523 @@ class AbaqusInputFile:
                 f"Abaqus input file {self.filename} not found at {self.path}."
             )
 
-    def cache_keywords(self, keyword_args: tuple[Literal[keywords]]) -> None:
-        """Create a cache based on the selected keywords
+    def close(self) -> None:
+        """Close the text file and every file opened to read blocks"""
+        self.file.close()
+        for binary_file in self.binary_files.values():
+            binary_file.close()
+        self.binary_files.clear()
+        for arrays in self.shared_arrays:
+            arrays.close()
+        self.shared_arrays.clear()
+
+    def index_keywords(self) -> list[index_entry]:
+        """Index every keyword line of the file with its byte offset and length.
+        The index is built once and stored in a sidecar file next to the input file,
+        so later runs on the same file skip the scan. *INCLUDE files are indexed in
+        place unless follow_includes is False, and their blocks are read from the
+        included file directly.
+
+        Returns:
+            list[index_entry]: keyword entries in logical order
+        """
+        if not self.index:
+            build = build_logical_index if self.follow_includes else build_index
+            self.set_index(build(self.file_path, self.use_sidecar))
+        return self.index
+
+    def set_index(self, index: keyword_index) -> None:
+        """Use an already built keyword index and derive the lookups from it"""
+        self.index = index["entries"]
+        self.signature = index["signature"]
+        self.keyword_lookup = {}
+        for entry in self.index:
+            key = entry["keyword"].lower()
+            self.keyword_lookup.setdefault((key, None), []).append(entry)
+            self.keyword_lookup.setdefault((key, entry["name"]), []).append(entry)
+        self.phases = PhaseRegistry(self.index)
+
+    def phase_registry(self) -> PhaseRegistry:
+        """Return the Elsets, Solid Sections and Orientations grouped by phase"""
+        self.index_keywords()
+        return self.phases  # type: ignore
+
+    def find_blocks(self, keyword: str, name: str | None = None) -> list[index_entry]:
+        """Return the index entries of a keyword, optionally filtered by name
 
         Args:
-            keyword_args:"Surface","Elset", "Nset", "NODE", "Element", "Orientation", "SolidSection"
+            keyword (str): keyword without the asterisk and whitespace, e.g. "SolidSection".
+                Keywords are case insensitive, as in Abaqus.
+            name (str | None, optional): name, elset or nset parameter. Defaults to None.
+        """
+        self.index_keywords()
+        return self.keyword_lookup.get((keyword.lower(), name), [])
+
+    def binary_file(self, source: str) -> BufferedReader:
+        """Binary handle of the input file or of an included file, opened once"""
+        if source not in self.binary_files:
+            self.binary_files[source] = open_binary(source)  # type: ignore
+        return self.binary_files[source]
+
+    def read_block(
+        self,
+        entry: index_entry,
+        include_header: bool = False,
+        max_bytes: int | None = None,
+    ) -> bytes:
+        """Read the data lines of a keyword block by seeking straight to it
+
+        Args:
+            entry (index_entry): entry from the keyword index
+            include_header (bool, optional): include the keyword line. Defaults to False.
+            max_bytes (int | None, optional): read at most this many bytes, e.g. to
+                look at the first rows only. Defaults to None.
 
         Returns:
-            nodes_type: _description_
+            bytes: raw contents of the block
         """
+        binary_file = self.binary_file(entry["file"])
+        start = entry["offset"] if include_header else entry["data_offset"]
+        binary_file.seek(start)
+        size = entry["offset"] + entry["length"] - start
+        return binary_file.read(size if max_bytes is None else min(size, max_bytes))
+
+    def block_columns(self, entry: index_entry) -> int:
+        """Number of values in one record of a numeric block"""
+        keyword = entry["keyword"].lower()
+        if keyword == "element":
+            return (
+                nodes_per_element(
+                    entry["params"]["type"].upper(),
+                    self.read_block(entry, max_bytes=4096),
+                )
+                + 1
+            )
+        if keyword in ("elset", "nset"):
+            return 3 if "generate" in entry["params"] else 1
+        return columns_of(self.read_block(entry, max_bytes=4096))
 
-        self.file.seek(0)  # Reset file pointer to the beginning
+    def iter_block(
+        self,
+        keyword: str,
+        name: str | None = None,
+        chunk_rows: int = 65536,
+        dtype: npt.DTypeLike | None = None,
+    ) -> Iterator[npt.NDArray]:
+        """Stream the data lines of numeric blocks as fixed size chunks of rows,
+        parsed straight from the file. Memory use does not depend on the block size.
 
-        for line_no, line in enumerate(self.file):
-            if "*" not in line:
+        Args:
+            keyword (str): "NODE", "Element", "Elset" or "Nset"
+            name (str | None, optional): nset or elset of the blocks, all blocks if None. Defaults to None.
+            chunk_rows (int, optional): rows per chunk. Defaults to 65536.
+            dtype (npt.DTypeLike | None, optional): dtype of the chunks. Defaults to
+                np.float64 for *NODE and np.int64 otherwise.
+
+        Yields:
+            npt.NDArray: (chunk_rows, columns) arrays, e.g. id and coordinates of nodes,
+                id and nodes of elements, (start, stop, step) of generate sets or
+                single ids of explicit sets. Chunks never span two blocks, so the last
+                chunk of each block may be shorter.
+        """
+        if keyword.lower() not in ("node", "element", "elset", "nset"):
+            raise AbaqusInputFileError(f"Blocks of *{keyword} are not numeric.")
+        if dtype is None:
+            dtype = np.float64 if keyword.lower() == "node" else np.int64
+
+        for entry in self.find_blocks(keyword, name):
+            if keyword.lower() in ("elset", "nset") and "generate" in entry["params"]:
+                # The step of a line is optional, so rows are not a fixed number of
+                # values. Generate blocks hold one line per range, they are small.
+                ranges = generate_ranges(self.read_block(entry)).astype(dtype)
+                for first in range(0, len(ranges), chunk_rows):
+                    yield ranges[first : first + chunk_rows]
                 continue
+            columns = self.block_columns(entry)
+            yield from iter_text_arrays(
+                self.binary_file(entry["file"]),
+                entry["data_offset"],
+                entry["offset"] + entry["length"],
+                columns,
+                chunk_rows,
+                dtype,
+            )
+
+    def parse_parallel(
+        self,
+        entries: list[index_entry],
+        columns: int,
+        dtype: npt.DTypeLike,
+        workers: int,
+    ) -> SharedArrays | None:
+        """Parse large one record per line blocks with a process pool into shared memory
+
+        Returns:
+            SharedArrays | None: ids and values, None if the blocks should be parsed
+                in this process (one worker, small blocks, compressed files or
+                irregular lines)
+        """
+        if any(is_compressed(entry["file"]) for entry in entries):
+            return None
+        ranges = [
+            (entry["file"], entry["data_offset"], entry["offset"] + entry["length"])
+            for entry in entries
+        ]
+        if workers <= 1 or sum(stop - start for _, start, stop in ranges) < (
+            MIN_PARALLEL_BYTES
+        ):
+            return None
+        try:
+            arrays = parse_rows_parallel(ranges, columns, dtype, workers)
+        except ValueError as e:
+            logger.warning(f"Parsing in this process instead of in parallel: {e}")
+            return None
+        self.shared_arrays.append(arrays)
+        return arrays
+
+    def load_nodes(
+        self,
+        name: str | None = None,
+        dtype: npt.DTypeLike = np.float64,
+        workers: int = 1,
+    ) -> NodeTable:
+        """Parse *NODE blocks in bulk into an (N, 3) coordinate array with an id to row lookup
+
+        Args:
+            name (str | None, optional): nset of the *NODE block, all blocks if None. Defaults to None.
+            dtype (npt.DTypeLike, optional): coordinate dtype, use np.float32 to halve
+                the memory. Defaults to np.float64.
+            workers (int, optional): processes used to parse large blocks in chunks,
+                the coordinates are then backed by shared memory until close. Defaults to 1.
+
+        Returns:
+            NodeTable: node ids, coordinates and lookup
+        """
+        key = (name, np.dtype(dtype).name)
+        if key not in self.node_tables:
+            entries = self.find_blocks("NODE", name)
+            if not entries:
+                raise AbaqusInputFileError(
+                    f"No *NODE block {name or ''} found in {self.filename}."
+                )
+            arrays = self.parse_parallel(
+                entries,
+                columns_of(self.read_block(entries[0], max_bytes=4096)),
+                dtype,
+                workers,
+            )
+            if arrays is not None:
+                self.node_tables[key] = NodeTable(arrays.ids, arrays.values)
+            else:
+                self.node_tables[key] = parse_nodes(
+                    [self.read_block(entry) for entry in entries], dtype
+                )
+            logger.info(
+                f"Loaded {len(self.node_tables[key])} nodes from {self.filename}"
+            )
+        return self.node_tables[key]
+
+    def load_elements(self, name: str | None = None, workers: int = 1) -> Connectivity:
+        """Parse *Element blocks in bulk into one connectivity array per element type
+
+        Args:
+            name (str | None, optional): elset of the *Element block, all blocks if None. Defaults to None.
+            workers (int, optional): processes used to parse large blocks in chunks,
+                the connectivity is then backed by shared memory until close. Defaults to 1.
+
+        Returns:
+            Connectivity: connectivity tables with an element id to row lookup
+        """
+        if name not in self.connectivity:
+            entries = self.find_blocks("Element", name)
+            if not entries:
+                raise AbaqusInputFileError(
+                    f"No *Element block {name or ''} found in {self.filename}."
+                )
+            by_type: dict[str, list[index_entry]] = {}
+            for entry in entries:
+                by_type.setdefault(entry["params"]["type"].upper(), []).append(entry)
+
+            tables: dict[str, ElementTable] = {}
+            for element_type, type_entries in by_type.items():
+                # Abaqus continues elements with more than 15 nodes on the next line
+                num_nodes = nodes_per_element(
+                    element_type, self.read_block(type_entries[0], max_bytes=4096)
+                )
+                arrays = None
+                if num_nodes < 16:
+                    arrays = self.parse_parallel(
+                        type_entries, num_nodes + 1, np.int32, workers
+                    )
+                if arrays is not None:
+                    tables[element_type] = ElementTable(
+                        element_type, arrays.ids, arrays.values
+                    )
+                else:
+                    tables.update(
+                        parse_elements(
+                            [
+                                (element_type, self.read_block(entry))
+                                for entry in type_entries
+                            ]
+                        ).tables
+                    )
+            self.connectivity[name] = Connectivity(tables)
+            logger.info(
+                f"Loaded {len(self.connectivity[name])} elements from {self.filename}"
+            )
+        return self.connectivity[name]
+
+    def get_set(self, kind: set_keywords, name: str) -> SetMembers:
+        """Return the members of an *Elset or *Nset. generate sets are kept as ranges,
+        explicit sets are only read and parsed when their members are first needed.
+
+        Args:
+            kind (set_keywords): "Elset" or "Nset"
+            name (str): name of the set
+
+        Returns:
+            SetMembers: lazy members of the set
+        """
+        key = (kind, name)
+        if key not in self.sets:
+            entries = self.find_blocks(kind, name)
+            if not entries:
+                raise AbaqusInputFileError(
+                    f"{kind} {name} not found in {self.filename}."
+                )
+            parts = [self.set_from_entry(entry) for entry in entries]
+            self.sets[key] = parts[0] if len(parts) == 1 else union(parts, name)
+        return self.sets[key]
+
+    def set_from_entry(self, entry: index_entry) -> SetMembers:
+        if "generate" in entry["params"]:
+            return parse_generate(entry["name"], self.read_block(entry))
+        return SetMembers(
+            entry["name"], loader=lambda: parse_explicit(self.read_block(entry))
+        )
+
+    def get_sets(self, kind: set_keywords, names: list[str]) -> list[SetMembers]:
+        return [self.get_set(kind, name) for name in names]
 
-            params = line_to_list(line)
+    def get_instance_elements(
+        self, phase_name: str
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """Element ids of every instance elset of a phase, e.g. Fiber_0, Fiber_1, ...
 
-            key = params[0][1:]  # Remove the asterisk from the keyword
+        Returns:
+            npt.NDArray[np.int64]: element ids, instance by instance
+            npt.NDArray[np.int64]: instance number of each element
+        """
+        registry = self.phase_registry()
+        members = [
+            self.get_set("Elset", name).to_array()
+            for name in registry.instance_names(phase_name)
+        ]
+        numbers = np.repeat(
+            registry.instance_numbers(phase_name), [len(m) for m in members]
+        )
+        return np.concatenate(members or [np.empty(0, np.int64)]), numbers
+
+    def get_elset_nodes(self, name: str) -> npt.NDArray[np.signedinteger]:
+        """Return the sorted unique node ids used by the elements of an elset"""
+        return self.load_elements().nodes_of(self.get_set("Elset", name).to_array())
+
+    def get_surface_faces(self, name: str) -> list[tuple[npt.NDArray[np.int64], int]]:
+        """Return the element faces of an element based *Surface
+
+        Args:
+            name (str): name of the surface
+
+        Returns:
+            list[tuple[npt.NDArray[np.int64], int]]: element ids and face number of each
+                data line, face number 1 for S1
+        """
+        entries = self.find_blocks("Surface", name)
+        if not entries:
+            raise AbaqusInputFileError(f"Surface {name} not found in {self.filename}.")
+
+        faces: list[tuple[npt.NDArray[np.int64], int]] = []
+        for entry in entries:
+            if entry["params"].get("type", "ELEMENT").upper() != "ELEMENT":
+                raise AbaqusInputFileError(
+                    f"Surface {name} is not an element based surface."
+                )
+            for line in self.read_block(entry).decode().splitlines():
+                if line.startswith("**"):
+                    continue
+                params = line_to_list(line)
+                if params[0] == "":
+                    continue
+                # Only the S1, S2, ... faces of solid elements, not SPOS, SNEG or E1
+                face = params[1].upper() if len(params) > 1 else ""
+                if not (face.startswith("S") and face[1:].isdigit()):
+                    raise AbaqusInputFileError(
+                        f"Face {face or 'label'} of surface {name} is not supported, "
+                        "only S1, S2, ... faces are."
+                    )
+                if params[0].isdigit():
+                    elements = np.array([int(params[0])], dtype=np.int64)
+                else:
+                    elements = self.get_set("Elset", params[0]).to_array()
+                faces.append((elements, int(face[1:])))
+        return faces
+
+    def get_surface_nodes(self, names: list[str]) -> dict[str, npt.NDArray[np.int64]]:
+        """Resolve element based surfaces to their node ids, all faces of all surfaces
+        in one vectorized pass over the connectivity
+
+        Args:
+            names (list[str]): surface names, e.g. every Surf-Fiber_k
+
+        Returns:
+            dict[str, npt.NDArray[np.int64]]: sorted unique node ids of each surface
+        """
+        element_parts: list[npt.NDArray[np.int64]] = []
+        face_parts: list[npt.NDArray[np.int64]] = []
+        group_parts: list[npt.NDArray[np.int64]] = []
+        for group, name in enumerate(names):
+            for elements, face_number in self.get_surface_faces(name):
+                element_parts.append(elements)
+                face_parts.append(np.full(len(elements), face_number, np.int64))
+                group_parts.append(np.full(len(elements), group, np.int64))
+
+        if not element_parts:
+            return {name: np.empty(0, np.int64) for name in names}
+
+        groups, nodes = self.load_elements().face_nodes(
+            np.concatenate(element_parts),
+            np.concatenate(face_parts),
+            np.concatenate(group_parts),
+        )
+        bounds = np.searchsorted(groups, np.arange(len(names) + 1))
+        return {
+            name: nodes[bounds[group] : bounds[group + 1]]
+            for group, name in enumerate(names)
+        }
+
+    def node_elements(self) -> NodeElementIndex:
+        """Return the node to element index of the whole mesh. It is built once from
+        the connectivity and stored in a .n2e.npz sidecar next to the keyword index.
+
+        Returns:
+            NodeElementIndex: elements attached to each node
+        """
+        if self.node_element_index is not None:
+            return self.node_element_index
+
+        self.index_keywords()
+        content_hash = self.signature["hash"] if self.signature else ""
+        sidecar = f"{self.file_path}.n2e.npz"
+        if self.use_sidecar and os.path.exists(sidecar):
+            with np.load(sidecar) as stored:
+                if str(stored["hash"]) == content_hash:
+                    self.node_element_index = NodeElementIndex(
+                        stored["node_ids"], stored["offsets"], stored["element_ids"]
+                    )
+                    logger.info(f"Loaded node to element index from {sidecar}")
+                    return self.node_element_index
+
+        self.node_element_index = build_node_elements(self.load_elements())
+        if self.use_sidecar:
+            try:
+                np.savez(
+                    sidecar,
+                    hash=np.array(content_hash),
+                    node_ids=self.node_element_index.node_ids,
+                    offsets=self.node_element_index.offsets,
+                    element_ids=self.node_element_index.element_ids,
+                )
+            except OSError as e:
+                logger.warning(f"Could not write node to element index {sidecar}: {e}")
+        return self.node_element_index
+
+    def get_elements_touching(
+        self, node_ids: npt.ArrayLike
+    ) -> npt.NDArray[np.signedinteger]:
+        """Return the sorted ids of the elements that use any of the given nodes"""
+        return self.node_elements().elements_of(node_ids)
+
+    def open_binary_cache(self) -> bool:
+        """Load the nodes, elements, sets and keyword index from the binary cache in
+        <file>.cache, memory mapped. If the cache is missing or the input changed, the
+        model is parsed and the cache is written for the next run.
+
+        Returns:
+            bool: True if the cache was valid (warm open), False if it was rebuilt
+        """
+        start = time.perf_counter()
+        manifest = load_manifest(self.file_path)
+        if manifest is not None and not is_unchanged(manifest):
+            # Touched or copied files keep the cache if their content is the same
+            self.index_keywords()
+            if self.signature is None or self.signature["hash"] != manifest["hash"]:
+                manifest = None
+
+        if manifest is not None:
+            data = load_mesh_cache(self.file_path, manifest)
+            if not self.index:
+                self.set_index(data["index"])
+            if data["nodes"] is not None:
+                dtype = data["nodes"].coordinates.dtype.name
+                self.node_tables[(None, dtype)] = data["nodes"]
+            if data["connectivity"] is not None:
+                self.connectivity[None] = data["connectivity"]
+            self.sets.update(data["sets"])
+            logger.info(
+                f"Opened {self.filename} from the binary cache in "
+                f"{time.perf_counter() - start:.3f} s (warm)"
+            )
+            return True
+
+        self.index_keywords()
+        nodes = self.load_nodes() if self.find_blocks("NODE") else None
+        connectivity = self.load_elements() if self.find_blocks("Element") else None
+        for kind in ("Elset", "Nset"):
+            for keyword, name in list(self.keyword_lookup):
+                if keyword == kind.lower() and name is not None:
+                    self.get_set(kind, name)  # type: ignore
+        try:
+            save_mesh_cache(
+                self.file_path,
+                {
+                    "index": {
+                        "version": INDEX_VERSION,
+                        "signature": self.signature,  # type: ignore
+                        "entries": self.index,
+                    },
+                    "nodes": nodes,
+                    "connectivity": connectivity,
+                    "sets": self.sets,
+                },
+            )
+        except OSError as e:
+            logger.warning(f"Could not write the binary cache of {self.filename}: {e}")
+        logger.info(
+            f"Parsed {self.filename} and built the binary cache in "
+            f"{time.perf_counter() - start:.3f} s (cold)"
+        )
+        return False
+
+    def cache_keywords(self, keyword_args: tuple[Literal[keywords]]) -> None:
+        """Create a cache based on the selected keywords
+
+        Args:
+            keyword_args:"Surface","Elset", "Nset", "NODE", "Element", "Orientation", "SolidSection"
+
+        Returns:
+            nodes_type: _description_
+        """
+
+        for entry in self.index_keywords():
+            key = entry["keyword"]
             if key not in keyword_args:
                 continue
 
-            result = organize_key(params, line_no)
+            params = line_to_list(entry["header"])
+            result = organize_key(
+                params, entry["line"], entry["offset"], entry["length"]
+            )
             if result is not None:
                 name, info = result
                 self.cache[key][name] = info  # type: ignore
@@ -143,14 +703,21 @@ class AbaqusInputFile:
     def get_phase_name(
         self, potential_phase_name: list[str], return_name: bool = False
     ) -> str:
-        if "Elset" not in self.cache:
-            self.cache_keywords(("Elset",))
-        for name in self.cache["Elset"]:
-            if any(name in phase_name for phase_name in potential_phase_name):
-                self.phase_name_list.append(name)
+        """Find the phase whose name is contained in one of the potential phase names.
+        Only phase names are compared, not every instance Elset.
+
+        Args:
+            potential_phase_name (list[str]): names the phase could have
+            return_name (bool, optional): kept for compatibility, the name is always returned.
 
-                if return_name:
-                    return name
+        Returns:
+            str: name of the phase, e.g. "Fiber"
+        """
+        for name in self.phase_registry().phases("Elset"):
+            if any(name in phase_name for phase_name in potential_phase_name):
+                if name not in self.phase_name_list:
+                    self.phase_name_list.append(name)
+                return name
         raise AbaqusInputFileError(f"Fiber name not found in fiber name list.")
 
     def get_all_phase(
@@ -172,23 +739,16 @@ class AbaqusInputFile:
         """
 
         def main(phase_name: str):
-            instance_counter = 0
-            found_phase = True
-            while found_phase is True:
-                if (
-                    self.cache["Elset"].get(f"{phase_name}_{instance_counter}")
-                    is not None
-                ):
-                    self.phase_name_list.append(f"{phase_name}_{instance_counter}")
-                    instance_counter += 1
-
-                else:
-                    found_phase = False
-
-            if instance_counter == 0:
+            instance_names = self.phase_registry().instance_names(phase_name)
+            if not instance_names:
                 raise AbaqusInputFileError(
                     f"Phase name {phase_name} not found in the file."
                 )
+
+            known_names = set(self.phase_name_list)
+            self.phase_name_list.extend(
+                name for name in instance_names if name not in known_names
+            )
             if return_list is True:
                 return self.phase_name_list
 
@@ -198,11 +758,9 @@ class AbaqusInputFile:
             )
 
         if phase_name is None and phase_name_list is not None:
-            if "Elset" not in self.cache:
-                self.cache_keywords(("Elset",))
             phase_name = self.get_phase_name(phase_name_list)
 
-            main(phase_name)
+            return main(phase_name)
 
         elif phase_name is not None and getattr(self, "phase_name_list") is not None:
             if phase_name not in self.phase_name_list:
@@ -211,4 +769,4 @@ class AbaqusInputFile:
                         f"Phase name {phase_name} not found in the file."
                     )
 
-            main(phase_name)
+            return main(phase_name)
@@ -0,0 +1,150 @@
+from typing import Callable, Iterable
+import numpy as np
+import numpy.typing as npt
+from ..data_parsing import strip_comments, text_to_array
+
+
+class SetMembers:
+    """Members of an *Elset or *Nset.
+
+    Sets written with the generate parameter are kept as (start, stop, step) ranges,
+    stop included as in Abaqus, until an array is needed. Explicit sets are parsed
+    on first use into a sorted array of unique ids.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ranges: npt.NDArray[np.int64] | None = None,
+        loader: Callable[[], npt.NDArray[np.int64]] | None = None,
+        members: npt.NDArray[np.int64] | None = None,
+    ) -> None:
+        self.name = name
+        self.ranges = ranges
+        self.loader = loader
+        self.members = members
+
+    @property
+    def is_range(self) -> bool:
+        return self.ranges is not None
+
+    def __len__(self) -> int:
+        if self.ranges is not None and self.members is None:
+            starts, stops, steps = self.ranges.T
+            if len(self.ranges) <= 1 or np.all(steps == 1) and is_disjoint(self.ranges):
+                return int(np.sum((stops - starts) // steps + 1))
+        return len(self.to_array())
+
+    def to_array(self) -> npt.NDArray[np.int64]:
+        """Return the members as a sorted array of unique ids"""
+        if self.members is None:
+            if self.ranges is not None and len(self.ranges) == 1:
+                start, stop, step = self.ranges[0]
+                self.members = np.arange(start, stop + 1, step, dtype=np.int64)
+            elif self.ranges is not None:
+                self.members = np.unique(
+                    np.concatenate(
+                        [
+                            np.arange(start, stop + 1, step)
+                            for start, stop, step in self.ranges
+                        ]
+                        or [np.empty(0, np.int64)]
+                    )
+                )
+            elif self.loader is not None:
+                self.members = self.loader()
+            else:
+                self.members = np.empty(0, np.int64)
+        return self.members
+
+    def contains(self, ids: npt.ArrayLike) -> npt.NDArray[np.bool_]:
+        """Return a mask of which ids are members, without materializing ranges"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.members is None and self.ranges is not None:
+            mask = np.zeros(ids.shape, dtype=bool)
+            for start, stop, step in self.ranges:
+                mask |= (ids >= start) & (ids <= stop) & ((ids - start) % step == 0)
+            return mask
+
+        members = self.to_array()
+        if len(members) == 0:
+            return np.zeros(ids.shape, dtype=bool)
+        position = np.minimum(np.searchsorted(members, ids), len(members) - 1)
+        return members[position] == ids
+
+
+def is_disjoint(ranges: npt.NDArray[np.int64]) -> bool:
+    order = np.argsort(ranges[:, 0], kind="stable")
+    starts, stops = ranges[order, 0], ranges[order, 1]
+    return bool(np.all(starts[1:] > stops[:-1]))
+
+
+def generate_ranges(data: bytes) -> npt.NDArray[np.int64]:
+    """Parse the (start, stop, step) lines of a generate set into an (N, 3) array,
+    step defaults to 1. ** comment lines are skipped."""
+    ranges: list[list[int]] = []
+    for line in strip_comments(data).splitlines():
+        values = [int(value) for value in line.split(b",") if value.strip()]
+        if not values:
+            continue
+        if len(values) < 2:
+            raise ValueError(f"Generate line {line!r} has no stop")
+        ranges.append(values[:3] if len(values) >= 3 else values[:2] + [1])
+    return np.array(ranges, dtype=np.int64).reshape(-1, 3)
+
+
+def parse_generate(name: str, data: bytes) -> SetMembers:
+    """Parse the lines of a generate set, see generate_ranges"""
+    return SetMembers(name, ranges=generate_ranges(data))
+
+
+def parse_explicit(data: bytes) -> npt.NDArray[np.int64]:
+    """Parse the id lines of an explicit set in bulk into a sorted array of unique ids,
+    ** comment lines are skipped"""
+    return np.unique(text_to_array(data, np.int64))
+
+
+def merge_ranges(ranges: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Merge overlapping or touching step 1 ranges"""
+    ranges = ranges[np.argsort(ranges[:, 0], kind="stable")]
+    stops = np.maximum.accumulate(ranges[:, 1])
+    new_group = np.ones(len(ranges), dtype=bool)
+    new_group[1:] = ranges[1:, 0] > stops[:-1] + 1
+    group_start = np.flatnonzero(new_group)
+    group_stop = np.append(group_start[1:], len(ranges)) - 1
+    return np.column_stack(
+        (ranges[group_start, 0], stops[group_stop], np.ones(len(group_start), np.int64))
+    )
+
+
+def union(sets: Iterable[SetMembers], name: str = "union") -> SetMembers:
+    """Union of many sets. Step 1 ranges are merged without materializing them."""
+    sets = list(sets)
+    if sets and all(s.is_range and np.all(s.ranges[:, 2] == 1) for s in sets):  # type: ignore
+        return SetMembers(
+            name, ranges=merge_ranges(np.concatenate([s.ranges for s in sets]))  # type: ignore
+        )
+    return SetMembers(
+        name,
+        members=np.unique(
+            np.concatenate([s.to_array() for s in sets] or [np.empty(0, np.int64)])
+        ),
+    )
+
+
+def intersection(sets: Iterable[SetMembers], name: str = "intersection") -> SetMembers:
+    """Intersection of many sets, ids present in every set"""
+    arrays = [s.to_array() for s in sets]
+    if not arrays:
+        return SetMembers(name, members=np.empty(0, np.int64))
+    ids, counts = np.unique(np.concatenate(arrays), return_counts=True)
+    return SetMembers(name, members=ids[counts == len(arrays)])
+
+
+def difference(
+    base: SetMembers, others: Iterable[SetMembers], name: str = "difference"
+) -> SetMembers:
+    """Members of base that are in none of the other sets"""
+    members = base.to_array()
+    removed = union(others).to_array()
+    return SetMembers(name, members=np.setdiff1d(members, removed, assume_unique=True))
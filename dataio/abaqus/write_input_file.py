@@ -1,10 +1,153 @@
-from io import TextIOWrapper
-from typing import List
+from io import BufferedReader, BufferedWriter, TextIOWrapper
+from itertools import islice
+from typing import Iterable, Iterator, List, Literal, TextIO
 from loguru import logger
+from ..compressed_io import (
+    compression_types,
+    is_compressed,
+    line_ending,
+    open_binary,
+    open_text,
+    suffixes,
+)
+from .keyword_index import (
+    build_index,
+    entry_name,
+    index_entry,
+    line_keyword,
+    normalize_keyword,
+    parse_keyword_line,
+)
+from .pipeline import BackgroundWriter, read_line_blocks, read_lines
 from .read_input_file import AbaqusInputFileError
-from .edit_functions.TemplateEditFunction import TemplateEditFunction
+from .edit_functions.TemplateEditFunction import SKIP_BLOCK, TemplateEditFunction
 import os
 
+copy_modes = Literal["lines", "pipeline", "ranges", "patch"]
+
+# Keywords of the mesh blocks that patch mode moves into shared include files
+mesh_keywords = {"node", "element", "elset", "nset", "surface"}
+# Runs of mesh blocks smaller than this stay in the driver file
+MIN_INCLUDE_BYTES = 1 << 16
+
+# A planned piece of the output: a (start, stop) byte range copied from the input
+# file as is, or the lines of an edited block, which may be a generator that is only
+# run when the block is written
+output_segment = tuple[int, int] | Iterable[str]
+
+# Lines joined into one write by write_lines
+WRITE_BATCH_LINES = 4096
+
+COPY_BUFFER_SIZE = 1 << 24
+
+
+def is_copy(segment: output_segment) -> bool:
+    return isinstance(segment, tuple)
+
+
+def write_lines(
+    target: TextIOWrapper | BufferedWriter,
+    lines: Iterable[str],
+    encoding: str | None = None,
+    newline: str = "\n",
+) -> None:
+    """Write lines as they are produced, in batches of WRITE_BATCH_LINES
+
+    Args:
+        target (TextIOWrapper | BufferedWriter): text file, or binary file with encoding
+        lines (Iterable[str]): lines with their line endings, e.g. a generator
+        encoding (str | None, optional): encoding of a binary target. Defaults to None.
+        newline (str, optional): line ending written for "\n" to a binary target,
+            as a text file would. Defaults to "\n".
+    """
+    iterator = iter(lines)
+    while batch := list(islice(iterator, WRITE_BATCH_LINES)):
+        if encoding is None:
+            target.writelines(batch)  # type: ignore
+            continue
+        text = "".join(batch)
+        if newline != "\n":
+            text = text.replace("\n", newline)
+        target.write(text.encode(encoding))  # type: ignore
+
+
+def copy_range(
+    source: BufferedReader,
+    target: BufferedWriter,
+    start: int,
+    stop: int,
+    kernel: bool = True,
+):
+    """Copy bytes [start, stop) of the source to the current position of the target,
+    in the kernel when possible (copy_file_range, then sendfile), else in large buffers.
+    kernel must be False when either file is compressed, as their file descriptors
+    hold the compressed bytes.
+    """
+    target.flush()
+    while kernel and start < stop:
+        try:
+            if hasattr(os, "copy_file_range"):
+                copied = os.copy_file_range(
+                    source.fileno(), target.fileno(), stop - start, start
+                )
+            else:
+                copied = os.sendfile(
+                    target.fileno(), source.fileno(), start, stop - start
+                )
+        except (AttributeError, OSError):
+            break
+        if copied == 0:
+            break
+        start += copied
+
+    if start < stop:
+        source.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = source.read(min(COPY_BUFFER_SIZE, remaining))
+            if not chunk:
+                break
+            target.write(chunk)
+            remaining -= len(chunk)
+        target.flush()
+
+
+def input_line_ending(file_path: str) -> str:
+    """Line ending of the first line of a file, CRLF or LF"""
+    with open_binary(file_path) as file:
+        data = file.read(1 << 16)
+    end = data.find(b"\n")
+    return "\r\n" if end > 0 and data[end - 1 : end] == b"\r" else "\n"
+
+
+def find_line_start(source: BufferedReader, text: str) -> int | None:
+    """Offset of the start of the first line that contains the text, None if absent"""
+    pattern = text.encode()
+    source.seek(0)
+    carry = b""  # Start of the last line of the previous chunk
+    offset = 0  # Offset of carry in the file
+    while chunk := source.read(COPY_BUFFER_SIZE):
+        data = carry + chunk
+        found = data.find(pattern)
+        if found != -1:
+            return offset + data.rfind(b"\n", 0, found) + 1
+        line_start = data.rfind(b"\n") + 1
+        offset += line_start
+        carry = data[line_start:]
+    return None
+
+
+def output_stop(
+    source: BufferedReader, break_point: str | None, entries: list[index_entry]
+) -> int:
+    """Offset where a planned output ends: the start of the line with the break point,
+    else the end of the last keyword block"""
+    stop = entries[-1]["offset"] + entries[-1]["length"] if entries else 0
+    if break_point is not None:
+        found = find_line_start(source, break_point)
+        stop = found if found is not None else stop
+    return stop
+
 
 class modify_file:
     def __init__(
@@ -15,14 +158,25 @@ class modify_file:
         open_input_file: TextIOWrapper | None = None,
         input_path: str | None = None,
         input_filename: str | None = None,
+        compression: compression_types | None = None,
+        newline: str | None = None,
     ):
-        self.file: TextIOWrapper
+        self.input_file: TextIOWrapper
         self.output_filename: str
         self.parse_args(
             open_input_file, input_path, input_filename, output_path, output_filename
         )
+        self.input_file_path: str = self.input_file.name
+        # Output as .inp.gz ("gzip" or the seekable "bgzf") or .inp.zst ("zstd"),
+        # compressed inputs are recognized by their suffix
+        self.compression = compression
+        # Line ending of the output as for open, None writes os.linesep. Every copy
+        # mode writes "\n" as self.line_ending, like the text file of copy_lines.
+        self.newline = newline
+        self.line_ending = line_ending(newline)
         self.output_path = output_path
         self.edit_functions = edit_functions
+        self.build_dispatch()
         self.output_file: TextIOWrapper = self.write_input_file()
         pass
 
@@ -55,7 +209,9 @@ class modify_file:
             self.input_file = open_input_file
 
         elif input_path and input_filename:
-            self.file = self.read_input_file(filename=input_filename, path=input_path)
+            self.input_file = self.read_input_file(
+                filename=input_filename, path=input_path
+            )
 
         else:
             raise ValueError(
@@ -66,7 +222,7 @@ class modify_file:
 
     def read_input_file(self, filename: str, path: str) -> TextIOWrapper:
         try:
-            file = open(f"{path}/{filename}", "r")
+            file = open_text(f"{path}/{filename}", "r")
             logger.info(f"Opened Abaqus input file: {path}")
             return file
         except FileNotFoundError:
@@ -88,7 +244,13 @@ class modify_file:
             TextIOWrapper: _description_
         """
         try:
-            file = open(f"{self.output_path}/{self.output_filename}.inp", "w")
+            suffix = suffixes[self.compression] if self.compression else ""
+            file = open_text(
+                f"{self.output_path}/{self.output_filename}.inp{suffix}",
+                "w",
+                self.compression,
+                newline=self.newline,
+            )
             logger.info(
                 f"Created new input file for {self.output_filename} in {self.output_path}"
             )
@@ -97,34 +259,561 @@ class modify_file:
         except FileExistsError:
             raise FileExistsError("File with the same name exists")
 
+    def build_dispatch(self) -> None:
+        """Map each normalized keyword to the edit functions that declared it. Functions
+        without keywords are checked on every line containing "*", as before."""
+        self.dispatch: dict[str, list[tuple[int, TemplateEditFunction]]] = {}
+        self.unkeyed_functions: list[tuple[int, TemplateEditFunction]] = []
+        for position, func in enumerate(self.edit_functions):
+            if not func.keywords:
+                self.unkeyed_functions.append((position, func))
+            for keyword in dict.fromkeys(map(normalize_keyword, func.keywords)):
+                self.dispatch.setdefault(keyword, []).append((position, func))
+
+    def candidate_functions(self, line: str) -> list[TemplateEditFunction]:
+        """Edit functions whose check_line should see the line, in their given order"""
+        keyword = line_keyword(line)
+        keyed = self.dispatch.get(keyword, []) if keyword is not None else []
+        if not keyed:
+            return [func for _, func in self.unkeyed_functions]
+
+        if any(func.names for _, func in keyed):
+            name = entry_name(parse_keyword_line(line)[1]).lower()
+            keyed = [
+                (position, func)
+                for position, func in keyed
+                if not func.names or name in (n.lower() for n in func.names)
+            ]
+        return [
+            func
+            for _, func in sorted(keyed + self.unkeyed_functions, key=lambda x: x[0])
+        ]
+
     def edit_line(self, line: list[str]) -> tuple[list[str], int]:
-        lines = line
+        edited = self.stream_edit(line)
+        if edited is None:
+            return line, 0
+        lines, skip_lines = edited
+        return list(lines), skip_lines
+
+    def stream_edit(self, line: list[str]) -> tuple[Iterable[str], int] | None:
+        """Apply the edit functions to a line through their stream_line method
+
+        Returns:
+            tuple[Iterable[str], int] | None: lines of the last function that applied,
+                possibly a generator, and the most lines any function skips, SKIP_BLOCK
+                if one skips the whole block. None if no function applied.
+        """
+        lines: Iterable[str] | None = None
         total_lines: list[int] = []
-        for func in self.edit_functions:
+        for func in self.candidate_functions(line[0]):
             if func.check_line(line):
-                lines, skip_lines = func.process_line(line)
+                if lines is not None:
+                    # Only the last output is written, run the others for their state
+                    list(lines)
+                lines, skip_lines = func.stream_line(line)
                 total_lines.append(skip_lines)
 
-        skip_lines = 0 if total_lines == [] else max(total_lines)
-        return lines, skip_lines
+        if lines is None:
+            return None
+        if SKIP_BLOCK in total_lines:
+            return lines, SKIP_BLOCK
+        return lines, max(total_lines)
+
+    def copy_and_edit(
+        self,
+        break_point: str | None = None,
+        mode: copy_modes = "lines",
+        shared_path: str | None = None,
+    ) -> None:
+        """Write the input file to the output file with the edit functions applied
+
+        Args:
+            break_point (str | None, optional): stop before the first line containing
+                this text. Defaults to None.
+            mode (copy_modes, optional): "lines" passes every line through Python,
+                "pipeline" does the same while a reader and a writer thread overlap
+                the file I/O with the edits, "ranges" plans the output from the
+                keyword index and copies unedited regions as raw byte ranges, "patch"
+                also moves untouched runs of mesh blocks into shared files that the
+                output references with *INCLUDE.
+                "ranges" and "patch" need every edit function to declare its keywords
+                and the input to have the line endings of the output.
+                Defaults to "lines".
+            shared_path (str | None, optional): directory of the shared mesh files of
+                patch mode. Defaults to the output directory.
+        """
+        if mode in ("ranges", "patch") and self.unkeyed_functions:
+            logger.warning(
+                "Edit functions without keywords need every line, copying line by line"
+            )
+            mode = "lines"
+        if mode in ("ranges", "patch") and not self.copies_line_endings():
+            logger.warning(
+                "Line endings of the input differ from the output, copying line by line"
+            )
+            mode = "lines"
+
+        if mode == "pipeline":
+            self.copy_pipelined(break_point)
+        elif mode == "ranges":
+            self.copy_ranges(break_point)
+        elif mode == "patch":
+            self.copy_patch(break_point, shared_path or self.output_path)
+        else:
+            self.copy_lines(break_point)
+
+        self.input_file.close()
+        self.output_file.close()
+
+    def plan_ranges(
+        self,
+        source: BufferedReader,
+        break_point: str | None = None,
+        entries: list[index_entry] | None = None,
+        stop: int | None = None,
+    ) -> list[output_segment]:
+        """Plan the output as byte ranges of the input and edited blocks. Only keyword
+        lines of declared keywords are read and passed to the edit functions.
+
+        Args:
+            source (BufferedReader): input file opened in binary mode
+            break_point (str | None, optional): stop before the first line containing
+                this text. Defaults to None.
+            entries (list[index_entry] | None, optional): keyword index of the input,
+                built or loaded from its sidecar if None. Defaults to None.
+            stop (int | None, optional): offset where the output ends, as returned by
+                output_stop, to plan several outputs without searching the break
+                point again. Defaults to None, which finds it.
+
+        Returns:
+            list[output_segment]: copy ranges and replacement text, in output order
+        """
+        if entries is None:
+            entries = build_index(self.input_file_path)["entries"]
+        if stop is None:
+            stop = output_stop(source, break_point, entries)
+
+        plan: list[output_segment] = []
+        position = 0
+        for entry in entries:
+            if entry["offset"] < position or entry["offset"] >= stop:
+                continue
+            if normalize_keyword(entry["keyword"]) not in self.dispatch:
+                continue
+
+            source.seek(entry["offset"])
+            # Edit functions see "\n" line endings, as from the text file of copy_lines
+            line = source.readline().decode().replace("\r\n", "\n")
+            edited = self.stream_edit([line])
+            if edited is None:
+                continue
 
-    def copy_and_edit(self, break_point: str | None = None):
+            new_lines, skip_lines = edited
+            if skip_lines == SKIP_BLOCK:
+                source.seek(entry["offset"] + entry["length"])
+            for _ in range(skip_lines):
+                source.readline()
+            plan.append((position, entry["offset"]))
+            plan.append(new_lines)
+            position = min(source.tell(), stop)
+
+        plan.append((position, stop))
+        return [
+            segment
+            for segment in plan
+            if not is_copy(segment) or segment[1] > segment[0]  # type: ignore
+        ]
+
+    def copy_ranges(self, break_point: str | None = None) -> None:
+        """Write the planned output: unedited ranges are copied by the kernel and only
+        the edited blocks are encoded in Python"""
+        self.output_file.flush()
+        target = self.output_file.buffer
+        kernel = self.kernel_copy()
+        with open_binary(self.input_file_path) as source:
+            for segment in self.plan_ranges(source, break_point):
+                if not is_copy(segment):
+                    write_lines(
+                        target,
+                        segment,  # type: ignore
+                        self.output_file.encoding,
+                        self.line_ending,
+                    )
+                else:
+                    copy_range(source, target, *segment, kernel)  # type: ignore
+        target.flush()
+
+    def copy_patch(self, break_point: str | None, shared_path: str) -> None:
+        """Write the planned output as a small driver file. Runs of mesh blocks that no
+        edit touches are written once to shared files named after the content hash of
+        the input and the byte range of the run, so every variant of the same input
+        references the same files.
+        """
+        self.output_file.flush()
+        target = self.output_file.buffer
+        encoding = self.output_file.encoding
+        os.makedirs(shared_path, exist_ok=True)
+        kernel = self.kernel_copy()
+        plain_source = not is_compressed(self.input_file_path)
+        with open_binary(self.input_file_path) as source:
+            index = build_index(self.input_file_path)
+            stem = os.path.basename(self.input_file_path).split(".")[0]
+            prefix = f"{stem}-mesh-{index['signature']['hash'][:12]}"
+            plan = self.plan_ranges(source, break_point, index["entries"])
+            stop = max((s[1] for s in plan if is_copy(s)), default=0)  # type: ignore
+            runs = mesh_runs(index["entries"], stop)
+
+            run = 0
+            for segment in plan:
+                if not is_copy(segment):
+                    write_lines(target, segment, encoding, self.line_ending)  # type: ignore
+                    continue
+                start, end = segment
+                while run < len(runs) and runs[run][1] <= end:
+                    run_start, run_end = runs[run]
+                    if run_start >= start:
+                        # The content hash and byte range name the content, so an
+                        # existing file can be reused whatever the break point
+                        path = os.path.join(
+                            shared_path, f"{prefix}-{run_start}-{run_end}.inp"
+                        )
+                        # Abaqus only reads plain include files
+                        write_shared_file(
+                            source, path, run_start, run_end, plain_source
+                        )
+                        copy_range(source, target, start, run_start, kernel)  # type: ignore
+                        relative = os.path.relpath(path, self.output_path)
+                        target.write(
+                            f"*INCLUDE, INPUT={relative.replace(os.sep, '/')}"
+                            f"{self.line_ending}".encode(encoding)
+                        )
+                        start = run_end
+                    run += 1
+                copy_range(source, target, start, end, kernel)  # type: ignore
+        target.flush()
+
+    def copies_line_endings(self) -> bool:
+        """Byte ranges copied from the input match the output of copy_lines only when
+        the input is written with the line ending of the output. The first line
+        stands for the whole file."""
+        return input_line_ending(self.input_file_path) == self.line_ending
+
+    def kernel_copy(self) -> bool:
+        """Ranges can be copied by the kernel only between plain files"""
+        return self.compression is None and not is_compressed(self.input_file_path)
+
+    def copy_lines(self, break_point: str | None = None) -> None:
+        self.input_file.seek(0)
+        self.edit_lines(self.input_file, self.output_file, break_point)
+
+    def copy_pipelined(self, break_point: str | None = None) -> None:
+        """copy_lines with the input read ahead by a reader thread and the output
+        encoded and written by a writer thread, while this thread runs the edits.
+        With keyed edit functions only keyword lines are split from the blocks."""
         self.input_file.seek(0)
-        for line in self.input_file:
+        self.output_file.flush()
+        if self.unkeyed_functions:
+            source = read_lines(self.input_file)
+            edit = self.edit_lines
+        else:
+            source = read_line_blocks(self.input_file)
+            edit = self.edit_blocks
+        try:
+            with BackgroundWriter(
+                self.output_file.buffer,  # type: ignore
+                self.output_file.encoding,
+                newline=self.line_ending,
+            ) as output:
+                edit(source, output, break_point)  # type: ignore
+        finally:
+            source.close()  # type: ignore
+
+    def edit_blocks(
+        self,
+        blocks: Iterator[str],
+        output: TextIO,
+        break_point: str | None = None,
+    ) -> None:
+        """edit_lines on blocks of whole lines, for edit functions that all declare
+        their keywords. Text between edited keyword lines is written as block slices.
+        """
+        skip_lines = 0
+        for block in blocks:
+            # Lines skipped by the last edit of the previous block
+            if skip_lines == SKIP_BLOCK:
+                position, skip_lines = skip_block(block, 0, break_point)
+            else:
+                position = skip(block, 0, skip_lines)
+                skip_lines -= block.count("\n", 0, position)
+            written = position
+            limit, stopped = line_limit(block, position, break_point)
+            while position < limit:
+                if block.startswith("*", position):
+                    start = position
+                else:
+                    start = block.find("\n*", position, limit)
+                    if start == -1:
+                        break
+                    start += 1
+                end = block.find("\n", start) + 1 or len(block)
+                position = end
+
+                line = block[start:end]
+                if line_keyword(line) not in self.dispatch:
+                    continue
+                edited = self.stream_edit([line])
+                if edited is None:
+                    continue
+                output.write(block[written:start])
+                new_lines, skip_lines = edited
+                write_lines(output, new_lines)
+
+                if skip_lines == SKIP_BLOCK:
+                    position, skip_lines = skip_block(block, end, break_point)
+                else:
+                    # Skipped lines are not checked for the break point, as in
+                    # edit_lines
+                    position = skip(block, end, skip_lines)
+                    skip_lines -= block.count("\n", end, position)
+                written = position
+                if position > limit:
+                    limit, stopped = line_limit(block, position, break_point)
+
+            output.write(block[written:limit])
+            if stopped:
+                return
+
+    def edit_lines(
+        self,
+        lines: Iterator[str],
+        output: TextIO,
+        break_point: str | None = None,
+    ) -> None:
+        skipping_block = False
+        for line in lines:
             if break_point is not None:
                 if break_point in line:
                     break
 
-            if "*" in line:
-                new_lines, skip_lines = self.edit_line([line])
-                for new_line in new_lines:
-                    self.output_file.write(new_line)
+            if skipping_block:
+                if line_keyword(line) is None:
+                    continue
+                skipping_block = False
+
+            if "*" in line and (
+                self.unkeyed_functions or line_keyword(line) in self.dispatch
+            ):
+                edited = self.stream_edit([line])
+                if edited is None:
+                    output.write(line)
+                    continue
+                new_lines, skip_lines = edited
+                write_lines(output, new_lines)
 
+                skipping_block = skip_lines == SKIP_BLOCK
                 for i in range(skip_lines):
-                    next(self.input_file)
+                    next(lines)
 
             else:
-                self.output_file.write(line)
+                output.write(line)
 
-        self.input_file.close()
-        self.output_file.close()
+
+def skip(block: str, position: int, lines: int) -> int:
+    """Position after skipping lines of a block from position, at most to its end"""
+    for _ in range(lines):
+        if position >= len(block):
+            break
+        position = block.find("\n", position) + 1 or len(block)
+    return position
+
+
+def skip_block(block: str, position: int, break_point: str | None) -> tuple[int, int]:
+    """Skip the data lines of a block from position up to the next keyword line
+
+    Returns:
+        int: start of the next keyword line, or of the line with the break point if
+            that comes first, else the end of the block
+        int: lines still to skip, SKIP_BLOCK if the block ended before a keyword line
+    """
+    limit, stopped = line_limit(block, position, break_point)
+    while position < limit:
+        if block.startswith("*", position) and not block.startswith("**", position):
+            return position, 0
+        found = block.find("\n*", position, limit)
+        if found == -1:
+            break
+        position = found + 1
+    return limit, 0 if stopped else SKIP_BLOCK
+
+
+def line_limit(block: str, position: int, break_point: str | None) -> tuple[int, bool]:
+    """Start of the first line of a block at or after position that contains the
+    break point, and whether there is one. The end of the block if there is none."""
+    if break_point is not None:
+        found = block.find(break_point, position)
+        if found != -1:
+            return max(block.rfind("\n", 0, found) + 1, position), True
+    return len(block), False
+
+
+def mesh_runs(entries: list[index_entry], stop: int) -> list[tuple[int, int]]:
+    """Byte ranges of consecutive mesh blocks (nodes, elements, sets and surfaces)
+
+    Args:
+        entries (list[index_entry]): keyword index of the physical file
+        stop (int): ignore blocks that end after this offset
+
+    Returns:
+        list[tuple[int, int]]: (start, stop) of each run of at least MIN_INCLUDE_BYTES
+    """
+    runs: list[tuple[int, int]] = []
+    start = end = -1
+    for entry in entries:
+        block_end = entry["offset"] + entry["length"]
+        if normalize_keyword(entry["keyword"]) in mesh_keywords and block_end <= stop:
+            if start == -1:
+                start = entry["offset"]
+            end = block_end
+            continue
+        if start != -1:
+            runs.append((start, end))
+            start = -1
+    if start != -1:
+        runs.append((start, end))
+    return [(start, end) for start, end in runs if end - start >= MIN_INCLUDE_BYTES]
+
+
+def write_shared_file(
+    source: BufferedReader, path: str, start: int, stop: int, kernel: bool = True
+):
+    """Copy a byte range of the source into its own file, unless it already exists"""
+    if os.path.exists(path):
+        return
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as target:
+        copy_range(source, target, start, stop, kernel)  # type: ignore
+    os.replace(temporary, path)
+    logger.info(f"Wrote shared mesh include {path}")
+
+
+def write_text(writer: modify_file, lines: Iterable[str]) -> None:
+    write_lines(
+        writer.output_file.buffer,  # type: ignore
+        lines,
+        writer.output_file.encoding,
+        writer.line_ending,
+    )
+
+
+def fan_out(
+    output_path: str,
+    variants: dict[str, List[TemplateEditFunction]],
+    input_path: str,
+    input_filename: str,
+    break_point: str | None = None,
+    compression: compression_types | None = None,
+    newline: str | None = None,
+) -> list[str]:
+    """Write one edited copy of an input file per variant, reading the input only once
+
+    The output of every variant is planned from the keyword index as in copy_and_edit
+    with mode="ranges". The copy ranges of all plans are then merged, and each
+    interval of the input is read once and written to every variant that keeps it.
+
+    Args:
+        output_path (str): directory of the output files
+        variants (dict[str, List[TemplateEditFunction]]): output filename (without
+            .inp) and edit functions of each variant
+        input_path (str): directory of the input file
+        input_filename (str): name of the input file, including the extension
+        break_point (str | None, optional): stop before the first line containing
+            this text. Defaults to None.
+        compression (compression_types | None, optional): compression of the output
+            files, see modify_file. Defaults to None.
+        newline (str | None, optional): line ending of the output files, see
+            modify_file. Defaults to None.
+
+    Returns:
+        list[str]: paths of the output files, in the order of variants
+    """
+    writers = [
+        modify_file(
+            output_path,
+            edit_functions,
+            output_filename=output_filename,
+            input_path=input_path,
+            input_filename=input_filename,
+            compression=compression,
+            newline=newline,
+        )
+        for output_filename, edit_functions in variants.items()
+    ]
+    paths = [writer.output_file.name for writer in writers]
+
+    planned: list[tuple[modify_file, list[output_segment]]] = []
+    input_file_path = f"{input_path}/{input_filename}"
+    with open_binary(input_file_path) as source:
+        entries = build_index(input_file_path)["entries"]
+        # Searched once, the plans of all variants end at the same offset
+        output_end = output_stop(source, break_point, entries)
+        for writer in writers:
+            if writer.unkeyed_functions or not writer.copies_line_endings():
+                logger.warning(
+                    f"{writer.output_filename} needs every line (edit functions "
+                    "without keywords or other line endings), writing it line by line"
+                )
+                writer.copy_and_edit(break_point, mode="lines")
+                continue
+            writer.input_file.close()
+            writer.output_file.flush()
+            planned.append(
+                (writer, writer.plan_ranges(source, break_point, entries, output_end))
+            )
+
+        boundaries = sorted(
+            {
+                bound
+                for _, plan in planned
+                for segment in plan
+                if is_copy(segment)
+                for bound in segment
+            }
+        )
+        # Next segment of each plan. Text segments are written as soon as they are
+        # next, copy ranges while the current interval lies inside them.
+        positions = [0] * len(planned)
+        for start, stop in zip(boundaries, boundaries[1:]):
+            targets: list[BufferedWriter] = []
+            for number, (writer, plan) in enumerate(planned):
+                position = positions[number]
+                while position < len(plan) and not is_copy(plan[position]):
+                    write_text(writer, plan[position])  # type: ignore
+                    position += 1
+                if position < len(plan):
+                    copy_start, copy_stop = plan[position]  # type: ignore
+                    if copy_start <= start and stop <= copy_stop:
+                        targets.append(writer.output_file.buffer)  # type: ignore
+                        if stop == copy_stop:
+                            position += 1
+                positions[number] = position
+
+            if not targets:
+                continue
+            source.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = source.read(min(COPY_BUFFER_SIZE, remaining))
+                if not chunk:
+                    break
+                for target in targets:
+                    target.write(chunk)
+                remaining -= len(chunk)
+
+    for (writer, plan), position in zip(planned, positions):
+        for segment in plan[position:]:
+            write_text(writer, segment)  # type: ignore
+    for writer in writers:
+        writer.output_file.close()
+    logger.info(f"Wrote {len(writers)} variants of {input_filename} in one pass")
+    return paths
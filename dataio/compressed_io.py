@@ -0,0 +1,288 @@
+import gzip
+import io
+import os
+import shutil
+import zlib
+from typing import BinaryIO, Callable, Literal, TextIO
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import zstandard
+except ImportError:  # Optional, only needed for .zst files
+    zstandard = None
+
+"""
+Transparent reading and writing of compressed input files. Files are recognized by
+their suffix: .gz is gzip and .zst is Zstandard. A .gz file with a .gzi block index
+next to it is block gzip: a series of independent gzip members of BLOCK_SIZE
+uncompressed bytes each, still readable by any gzip reader, where a seek only
+decompresses the block that holds the target offset.
+"""
+
+compression_types = Literal["gzip", "zstd", "bgzf"]
+
+BLOCK_SIZE = 1 << 18
+BLOCK_INDEX_SUFFIX = ".gzi"
+COPY_BUFFER_SIZE = 1 << 24
+
+suffixes: dict[str, str] = {"gzip": ".gz", "bgzf": ".gz", "zstd": ".zst"}
+
+
+def block_index_path(file_path: str) -> str:
+    return f"{file_path}{BLOCK_INDEX_SUFFIX}"
+
+
+def compression_of(file_path: str) -> compression_types | None:
+    """Compression of a file from its suffix, None for plain files"""
+    if file_path.endswith(".zst"):
+        return "zstd"
+    if file_path.endswith(".gz"):
+        return "bgzf" if os.path.exists(block_index_path(file_path)) else "gzip"
+    return None
+
+
+def is_compressed(file_path: str) -> bool:
+    return compression_of(file_path) is not None
+
+
+def require_zstandard() -> None:
+    if zstandard is None:
+        raise ImportError("Reading or writing .zst files needs the zstandard package")
+
+
+class SeekableStream(io.RawIOBase):
+    """Seekable reader over a decompression stream that can only be read forward.
+    Seeking forward decompresses and discards, seeking backward reopens the stream.
+    """
+
+    def __init__(self, name: str, open_stream: Callable[[], BinaryIO]) -> None:
+        self.name = name
+        self.open_stream = open_stream
+        self.stream = open_stream()
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        data = self.stream.read(len(buffer))
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Compressed streams only seek from the start")
+        if offset < self.position:
+            self.stream.close()
+            self.stream = self.open_stream()
+            self.position = 0
+        while self.position < offset:
+            skipped = len(
+                self.stream.read(min(COPY_BUFFER_SIZE, offset - self.position))
+            )
+            if skipped == 0:
+                break
+            self.position += skipped
+        return self.position
+
+    def close(self) -> None:
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+class BlockGzipReader(io.RawIOBase):
+    """Random access reader of a block gzip file, see BlockGzipWriter"""
+
+    def __init__(self, file_path: str) -> None:
+        self.name = file_path
+        self.file = open(file_path, "rb")
+        with open(block_index_path(file_path), "rb") as index:
+            offsets: npt.NDArray[np.int64] = np.load(index)
+        self.compressed_offsets = offsets[:, 0]
+        self.uncompressed_offsets = offsets[:, 1]
+        self.size = int(self.uncompressed_offsets[-1])
+        self.position = 0
+        self.block_number = -1
+        self.block = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def load_block(self, number: int) -> None:
+        if number != self.block_number:
+            start = self.compressed_offsets[number]
+            self.file.seek(start)
+            data = self.file.read(self.compressed_offsets[number + 1] - start)
+            self.block = zlib.decompress(data, wbits=31)
+            self.block_number = number
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        if self.position >= self.size:
+            return 0
+        number = (
+            int(np.searchsorted(self.uncompressed_offsets, self.position, "right")) - 1
+        )
+        self.load_block(number)
+        start = self.position - int(self.uncompressed_offsets[number])
+        data = self.block[start : start + len(buffer)]
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(offset, 0)
+        return self.position
+
+    def close(self) -> None:
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+class BlockGzipWriter(io.RawIOBase):
+    """Write a gzip file as independent members of BLOCK_SIZE uncompressed bytes and
+    store the compressed and uncompressed offset of every block in a .gzi file
+    """
+
+    def __init__(self, file_path: str, level: int = 6) -> None:
+        self.name = file_path
+        self.file = open(file_path, "wb")
+        self.level = level
+        self.pending = bytearray()
+        self.offsets: list[tuple[int, int]] = [(0, 0)]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore
+        self.pending += data
+        while len(self.pending) >= BLOCK_SIZE:
+            self.write_block(bytes(self.pending[:BLOCK_SIZE]))
+            del self.pending[:BLOCK_SIZE]
+        return len(data)
+
+    def write_block(self, block: bytes) -> None:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        data = compressor.compress(block) + compressor.flush()
+        self.file.write(data)
+        compressed, uncompressed = self.offsets[-1]
+        self.offsets.append((compressed + len(data), uncompressed + len(block)))
+
+    def close(self) -> None:
+        if not self.closed:
+            if self.pending:
+                self.write_block(bytes(self.pending))
+                self.pending.clear()
+            self.file.close()
+            with open(block_index_path(self.name), "wb") as index:
+                np.save(index, np.array(self.offsets, dtype=np.int64))
+        super().close()
+
+
+def open_binary(
+    file_path: str,
+    mode: Literal["rb", "wb"] = "rb",
+    compression: compression_types | None = None,
+    level: int = 6,
+) -> BinaryIO:
+    """Open a plain or compressed file in binary mode. Readers are seekable, offsets
+    are positions in the uncompressed data.
+
+    Args:
+        file_path (str): path of the file
+        mode (Literal["rb", "wb"], optional): read or write. Defaults to "rb".
+        compression (compression_types | None, optional): compression of a new file,
+            from the suffix if None. Reading always uses the suffix. Defaults to None.
+        level (int, optional): compression level when writing. Defaults to 6.
+
+    Returns:
+        BinaryIO: file object
+    """
+    if mode == "rb":
+        compression = compression_of(file_path)
+    elif compression is None:
+        compression = compression_of(file_path)
+        if compression == "bgzf":
+            compression = "gzip"  # A stale block index of an older file
+
+    if compression is None:
+        return open(file_path, mode)
+    if compression == "gzip":
+        if mode == "wb" and os.path.exists(block_index_path(file_path)):
+            os.remove(block_index_path(file_path))
+        return gzip.open(file_path, mode, compresslevel=level)  # type: ignore
+    if compression == "bgzf":
+        if mode == "rb":
+            return io.BufferedReader(BlockGzipReader(file_path))  # type: ignore
+        return io.BufferedWriter(BlockGzipWriter(file_path, level))  # type: ignore
+
+    require_zstandard()
+    if mode == "rb":
+        return io.BufferedReader(  # type: ignore
+            SeekableStream(
+                file_path,
+                lambda: zstandard.ZstdDecompressor().stream_reader(  # type: ignore
+                    open(file_path, "rb"), closefd=True
+                ),
+            ),
+            buffer_size=1 << 20,
+        )
+    return zstandard.ZstdCompressor(level=level).stream_writer(  # type: ignore
+        open(file_path, "wb"), closefd=True
+    )
+
+
+def open_text(
+    file_path: str,
+    mode: Literal["r", "w"] = "r",
+    compression: compression_types | None = None,
+    level: int = 6,
+    newline: str | None = None,
+) -> TextIO:
+    """Open a plain or compressed file in text mode, see open_binary. newline is
+    passed to the text wrapper as for open."""
+    if compression is None and compression_of(file_path) is None:
+        return open(file_path, mode, newline=newline)
+    binary = open_binary(file_path, f"{mode}b", compression, level)  # type: ignore
+    return io.TextIOWrapper(binary, newline=newline)  # type: ignore
+
+
+def line_ending(newline: str | None) -> str:
+    """Line ending written for "\n" by a text file opened with this newline argument"""
+    if newline is None:
+        return os.linesep
+    return newline or "\n"
+
+
+def compress_file(
+    source_path: str,
+    target_path: str,
+    compression: compression_types | None,
+    level: int = 6,
+) -> None:
+    """Copy a file into a plain or compressed file, streaming in large buffers"""
+    with open_binary(source_path) as source, open_binary(
+        target_path, "wb", compression, level
+    ) as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
@@ -1,9 +1,95 @@
 import re
+from typing import BinaryIO, Iterator
+import numpy as np
+import numpy.typing as npt
 
 whitespace_re = re.compile(r"\s+", flags=re.UNICODE)
+# A ** comment line, newline included; blocks run up to the next keyword so they keep
+# the comments written between keywords
+comment_line_re = re.compile(rb"^\*\*[^\n]*(?:\n|$)", flags=re.MULTILINE)
 
 
 def line_to_list(line: str, delimiter: str = ",") -> list[str]:
     # Remove all whitespace (Unicode) and split by comma
     line = whitespace_re.sub("", line)
     return line.split(delimiter)
+
+
+def strip_comments(data: bytes) -> bytes:
+    """Remove the ** comment lines of a keyword block"""
+    if b"**" not in data:
+        return data
+    return comment_line_re.sub(b"", data)
+
+
+def text_to_array(data: bytes, dtype: npt.DTypeLike = np.float64) -> npt.NDArray:
+    """Parse comma and newline separated numbers into a flat array in one call
+
+    Args:
+        data (bytes): data lines of a keyword block, ** comment lines are skipped
+        dtype (npt.DTypeLike, optional): dtype of the result. Defaults to np.float64.
+
+    Returns:
+        npt.NDArray: every value of the block, in reading order
+    """
+    flat = strip_comments(data).replace(b"\n", b",")
+    try:
+        return np.fromstring(flat, dtype=dtype, sep=" ,")
+    except ValueError:
+        # Blank lines and trailing commas leave empty fields that fromstring rejects
+        values = [value for value in flat.split(b",") if value.strip()]
+        return np.array(values, dtype=np.float64).astype(dtype)
+
+
+# Bytes read from the file at a time by iter_text_arrays
+READ_SIZE = 1 << 22
+
+
+def iter_text_arrays(
+    file: BinaryIO,
+    start: int,
+    stop: int,
+    columns: int,
+    chunk_rows: int,
+    dtype: npt.DTypeLike = np.float64,
+) -> Iterator[npt.NDArray]:
+    """Parse a byte range of comma separated numbers in fixed size chunks of rows.
+    Memory stays bounded by READ_SIZE and chunk_rows whatever the size of the range.
+
+    Args:
+        file (BinaryIO): file opened in binary mode
+        start (int): offset of the first data line
+        stop (int): offset after the last data line
+        columns (int): values per row, rows may continue over several lines
+        chunk_rows (int): rows per chunk, only the last chunk may be shorter
+        dtype (npt.DTypeLike, optional): dtype of the chunks. Defaults to np.float64.
+
+    Yields:
+        npt.NDArray: (chunk_rows, columns) arrays, in file order
+    """
+    chunk_size = chunk_rows * columns
+    pending = np.empty(0, dtype)
+    position = start
+    while position < stop:
+        file.seek(position)
+        data = file.read(min(READ_SIZE, stop - position))
+        if not data:
+            break
+        if position + len(data) < stop:
+            # Cut at the last complete line, the rest is read again with the next block
+            end = data.rfind(b"\n") + 1
+            data = data[:end] if end > 0 else data + file.readline()
+        position += len(data)
+
+        pending = np.concatenate((pending, text_to_array(data, dtype)))
+        full = len(pending) // chunk_size * chunk_size
+        for offset in range(0, full, chunk_size):
+            yield pending[offset : offset + chunk_size].reshape(chunk_rows, columns)
+        pending = pending[full:].copy()
+
+    if len(pending) % columns:
+        raise ValueError(
+            f"{len(pending) % columns} values left over in an incomplete row"
+        )
+    if len(pending):
+        yield pending.reshape(-1, columns)
@@ -2,6 +2,7 @@ from typing import Literal, Union, Tuple
 import numpy as np
 from numpy import typing as npt
 from loguru import logger
+from ..compressed_io import open_text
 from ..data_parsing import line_to_list
 
 
@@ -68,7 +69,7 @@ class DigimatPhaseOrientationFile:
     def check_file(self) -> bool:
         logger.info(f"Checking orientation file: {self.filename} at path: {self.path}")
         try:
-            file = open(f"{self.path}/{self.filename}", "r")
+            file = open_text(f"{self.path}/{self.filename}", "r")
 
         except FileNotFoundError:
             logger.error(f"Orientation file {self.filename} not found at {self.path}.")
@@ -99,13 +100,14 @@ class DigimatPhaseOrientationFile:
 
         logger.info(f"Reading orientation file: {self.filename} from path: {self.path}")
 
-        self.data = np.genfromtxt(
-            f"{self.path}/{self.filename}",
-            delimiter=";",
-            skip_header=1,
-            dtype=float,
-            usecols=self.get_columns(columns),
-        )
+        with open_text(f"{self.path}/{self.filename}", "r") as file:
+            self.data = np.genfromtxt(
+                file,
+                delimiter=";",
+                skip_header=1,
+                dtype=float,
+                usecols=self.get_columns(columns),
+            )
         logger.debug(f"Data shape: {self.data.shape}")
 
         logger.success(
@@ -23,3 +23,84 @@ def perpendicular_vector(
     return normal_vector / np.linalg.norm(
         normal_vector
     )  # Optional: make it a unit vector
+
+
+def spherical_to_cartesian_array(
+    theta: npt.NDArray[np.float64], phi: npt.NDArray[np.float64], r: int = 1
+) -> npt.NDArray[np.float64]:
+    """spherical_to_cartesian for arrays of angles
+
+    Returns:
+        npt.NDArray[np.float64]: (N, 3) unit vectors scaled by r
+    """
+    x = r * np.sin(theta) * np.cos(phi)
+    y = r * np.sin(theta) * np.sin(phi)
+    z = r * np.cos(theta)
+    return np.column_stack((x, y, z))
+
+
+def perpendicular_vectors(
+    vectors: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """perpendicular_vector for each row of an (N, 3) array. Rows whose x and y
+    components are close to zero (as in np.allclose) are crossed with the x axis
+    instead of the z axis.
+    """
+    near_z = np.all(np.abs(vectors[:, :2]) <= 1e-8, axis=1)
+    temp_vectors = np.zeros_like(vectors)
+    temp_vectors[~near_z, 2] = 1
+    temp_vectors[near_z, 0] = 1
+
+    normal_vectors = np.cross(vectors, temp_vectors)
+    # Row wise dot products, as np.linalg.norm of a single vector, so the result
+    # matches perpendicular_vector to the last bit
+    norms = np.sqrt(np.matmul(normal_vectors[:, None, :], normal_vectors[:, :, None]))
+    return normal_vectors / norms[:, 0]
+
+
+def cluster_directions(
+    vectors: npt.NDArray[np.float64], tolerance: float
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """Group unit vectors that are parallel or antiparallel within a tolerance
+
+    Vectors are flipped onto the upper half of the unit sphere and hashed into a grid
+    of cubes with edge sin(tolerance) / sqrt(3). Each occupied cube is one cluster,
+    represented by the normalized mean of its vectors, which is at most tolerance
+    away from every member.
+
+    Args:
+        vectors (npt.NDArray[np.float64]): (N, 3) unit vectors
+        tolerance (float): largest angle between a vector and its representative, in
+            radians
+
+    Returns:
+        npt.NDArray[np.int64]: (N,) cluster of each vector, numbered by first member
+        npt.NDArray[np.float64]: (C, 3) unit representative of each cluster
+
+    Raises:
+        ValueError: if tolerance is not between 0 and pi / 2, exclusive
+    """
+    if not 0 < tolerance < np.pi / 2:
+        raise ValueError(f"Tolerance {tolerance} is not between 0 and pi / 2 radians")
+    x, y, z = vectors[:, 0], vectors[:, 1], vectors[:, 2]
+    flip = (z < 0) | ((z == 0) & ((y < 0) | ((y == 0) & (x < 0))))
+    canonical = np.where(flip[:, None], -vectors, vectors)
+
+    cells = np.floor(canonical / (np.sin(tolerance) / np.sqrt(3))).astype(np.int64)
+    _, first, labels = np.unique(cells, axis=0, return_index=True, return_inverse=True)
+    # Number the clusters in the order of their first member
+    order = np.argsort(np.argsort(first))
+    labels = order[labels.ravel()]
+
+    sums = np.zeros((len(first), 3))
+    np.add.at(sums, labels, canonical)
+    representatives = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return labels, representatives
+
+
+def angles_between(
+    a: npt.NDArray[np.float64], b: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]:
+    """Angle between the lines along the rows of a and b, in radians, 0 to pi / 2"""
+    cosines = np.abs(np.sum(a * b, axis=1))
+    return np.arccos(np.clip(cosines, 0, 1))
@@ -1,7 +1,17 @@
 from dataio.abaqus.edit_functions.TemplateEditFunction import TemplateEditFunction
 from dataio.abaqus.read_input_file import AbaqusInputFile as rAbaqusIF
 from dataio.abaqus.write_input_file import modify_file
-from dataio.abaqus.edit_functions.add_orientation import add_orientation
+from dataio.abaqus.output_manifest import (
+    discard_manifest,
+    hash_bytes,
+    is_current,
+    new_manifest,
+    save_manifest,
+)
+from dataio.abaqus.edit_functions.add_orientation import (
+    add_orientation,
+    orientation_modes,
+)
 from dataio.abaqus.edit_functions.change_material_property import (
     change_material_property,
 )
@@ -31,7 +41,19 @@ def run(
     input_path: str,
     output_path: str,
     potential_phase_name: list[str] = ["Fiber"],
-):
+    force: bool = False,
+    angle_tolerance: float | None = None,
+    output_mode: orientation_modes = "sections",
+) -> bool:
+    """Write the input file with fiber orientations and the fiber conductivity.
+    The output is skipped when its manifest shows it was written from the same input
+    file, orientation file and edit functions. With angle_tolerance (degrees), fibers
+    that agree within the tolerance share one *Orientation. With output_mode
+    "distribution", the orientations are written as one element wise *Distribution.
+
+    Returns:
+        bool: True if the output was written, False if it was already current
+    """
     abaqus_original = rAbaqusIF(filename=f"{input_filename}.inp", path=input_path)
 
     abaqus_original.cache_keywords(("Elset",))
@@ -42,20 +64,26 @@ def run(
     orientation_file_name = (
         f"DefaultJobName_{input_filename}_{fiber_name}_orientation.txt"
     )
-    zip_path = f"{input_path}\\DefaultJobName_{input_filename}.zip"  # TODO: Add correct name for zip_file
+    zip_path = os.path.join(
+        input_path, f"DefaultJobName_{input_filename}.zip"
+    )  # TODO: Add correct name for zip_file
     if not os.path.exists(zip_path):
         raise FileNotFoundError(
             f"Input file zip file could not be found, search for the following path: {zip_path}"
         )
 
     with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        orientation_hash = hash_bytes(zip_ref.read(orientation_file_name))
         zip_ref.extract(orientation_file_name, input_path)
 
     orientation_file = digimatPOF(orientation_file_name, input_path, fiber_name)
     orientation = orientation_file.get_csv(columns=("theta", "phi"))
 
     orientation_function = add_orientation(
-        phase_name=fiber_name, orientation_list=orientation
+        phase_name=fiber_name,
+        orientation_list=orientation,
+        angle_tolerance=angle_tolerance,
+        output_mode=output_mode,
     )
 
     fiber_conductivity = change_material_property(
@@ -63,6 +91,7 @@ def run(
         property_name="Conductivity",
         new_isotropy="Orthotropic",
         new_values=(6.83e-3, 2.18e-3, 2.18e-3),
+        entries=abaqus_original.index_keywords(),
     )
 
     all_functions: list[TemplateEditFunction] = [
@@ -70,6 +99,26 @@ def run(
         fiber_conductivity,
     ]
 
+    output_file = os.path.join(output_path, f"{input_filename}.inp")
+    manifest = new_manifest(
+        abaqus_original.file_path,
+        all_functions,
+        inputs={orientation_file_name: orientation_hash},
+        writer={"break_point": "STEP"},
+    )
+    if not force and is_current(output_file, manifest):
+        logger.info(f"{output_file} is up to date, skipping")
+        abaqus_original.close()
+        return False
+
+    if output_mode == "distribution":
+        # Only resolved for outputs that are written, the manifest does not need them
+        orientation_function.fiber_elements = abaqus_original.get_instance_elements(
+            fiber_name
+        )
+
+    # A run that fails from here on leaves no manifest next to the partial output
+    discard_manifest(output_file)
     new_file = modify_file(
         input_filename=input_filename,
         open_input_file=abaqus_original.file,
@@ -77,14 +126,44 @@ def run(
         edit_functions=all_functions,
     )
 
-    new_file.copy_and_edit(break_point="STEP")
+    new_file.copy_and_edit(break_point="STEP", mode="ranges")
+    save_manifest(output_file, manifest)
+    abaqus_original.close()
+    return True
 
 
-def batched_run(input_path: str, output_path: str):
+def batched_run(
+    input_path: str,
+    output_path: str,
+    force: bool = False,
+    angle_tolerance: float | None = None,
+    output_mode: orientation_modes = "sections",
+):
+    """Run every input file of a directory, rebuilding only outputs that are out of date
+
+    Args:
+        input_path (str): directory of the input files and Digimat zip files
+        output_path (str): directory of the output files
+        force (bool, optional): rebuild every output. Defaults to False.
+        angle_tolerance (float | None, optional): share orientations of fibers that
+            agree within this angle in degrees, see add_orientation. Defaults to None.
+        output_mode (orientation_modes, optional): "sections" or "distribution", see
+            add_orientation. Defaults to "sections".
+    """
     filenames = [f for f in os.listdir(input_path) if f.endswith(".inp")]
 
+    written = 0
     for file in filenames:
-        run(input_filename=file[:-4], input_path=input_path, output_path=output_path)
+        if run(
+            input_filename=file[:-4],
+            input_path=input_path,
+            output_path=output_path,
+            force=force,
+            angle_tolerance=angle_tolerance,
+            output_mode=output_mode,
+        ):
+            written += 1
+    logger.info(f"Rebuilt {written} of {len(filenames)} outputs")
 
 
 if __name__ == "__main__":
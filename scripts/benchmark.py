@@ -0,0 +1,384 @@
+import os
+import shutil
+import sys
+import time
+from typing import Callable
+import numpy as np
+from loguru import logger
+
+from dataio import compressed_io
+from dataio.abaqus import keyword_index as ki
+from dataio.abaqus.binary_cache import cache_path
+from dataio.abaqus.edit_functions.add_orientation import add_orientation
+from dataio.abaqus.read_input_file import AbaqusInputFile
+from dataio.abaqus.write_input_file import modify_file
+
+"""
+Benchmarks for the Abaqus input file tooling. Each benchmark runs on a synthetic
+Digimat style RVE mesh (DC3D4 elements, Fiber_k elsets and surfaces, materials and a
+step), so results can be reproduced without a Digimat licence.
+
+Run from the repository root:
+python -m scripts.benchmark <working directory> <number of nodes>
+"""
+
+
+def write_synthetic_input(
+    file_path: str,
+    num_nodes: int = 1_000_000,
+    num_fibers: int = 1_000,
+    elements_per_fiber: int = 500,
+    seed: int = 0,
+) -> None:
+    """Write a Digimat style input file with a fiber phase and a matrix phase
+
+    Args:
+        file_path (str): path of the new input file
+        num_nodes (int, optional): number of nodes. Defaults to 1_000_000.
+        num_fibers (int, optional): number of Fiber_k elsets. Defaults to 1_000.
+        elements_per_fiber (int, optional): elements in each fiber. Defaults to 500.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+    """
+    rng = np.random.default_rng(seed)
+    num_fiber_elements = num_fibers * elements_per_fiber
+    num_elements = max(2 * num_fiber_elements, num_nodes * 5)
+
+    with open(file_path, "w", newline="\n") as file:
+        file.write("*Heading\n** Synthetic Digimat RVE\n*NODE, NSET=ALL_NODES\n")
+        nodes = np.column_stack(
+            (np.arange(1, num_nodes + 1), rng.random((num_nodes, 3)))
+        )
+        np.savetxt(file, nodes, fmt=("%d", "%.8e", "%.8e", "%.8e"), delimiter=", ")
+        # Abaqus/CAE writes comment lines between blocks, they end up in the blocks
+        file.write("**\n** Elements\n**\n")
+
+        file.write("*Element, type=DC3D4, ELSET=ALL_ELEMENTS\n")
+        elements = np.column_stack(
+            (
+                np.arange(1, num_elements + 1),
+                rng.integers(1, num_nodes + 1, size=(num_elements, 4)),
+            )
+        )
+        np.savetxt(file, elements, fmt="%d", delimiter=", ")
+        file.write("** Sets\n")
+
+        file.write(f"*Elset, elset=Fiber, generate\n1, {num_fiber_elements}, 1\n")
+        file.write("** Section: Section-Fiber\n")
+        for fiber in range(num_fibers):
+            first = fiber * elements_per_fiber + 1
+            last = first + elements_per_fiber - 1
+            if fiber % 2 == 0:
+                file.write(f"*Elset, elset=Fiber_{fiber}, generate\n")
+                file.write(f"{first}, {last}, 1\n")
+            else:
+                file.write(f"*Elset, elset=Fiber_{fiber}\n")
+                members = np.arange(first, last + 1)
+                rows = len(members) // 16
+                np.savetxt(
+                    file, members[: rows * 16].reshape(-1, 16), fmt="%d", delimiter=", "
+                )
+                if len(members) % 16:
+                    file.write(", ".join(map(str, members[rows * 16 :])) + "\n")
+                file.write("**\n")
+            file.write(f"*Elset, elset=_Surf-Fiber_{fiber}_S1, generate\n")
+            file.write(f"{first}, {min(first + 9, last)}, 1\n")
+            file.write(f"*Surface, type=ELEMENT, name=Surf-Fiber_{fiber}\n")
+            file.write(f"** Surface: Surf-Fiber_{fiber}\n")
+            file.write(f"_Surf-Fiber_{fiber}_S1, S1\n")
+
+        file.write(
+            f"*Elset, elset=Matrix, generate\n{num_fiber_elements + 1}, {num_elements}, 1\n"
+        )
+        file.write("*Solid Section, elset=Fiber, material=Carbon_Fiber\n,\n")
+        file.write("*Solid Section, elset=Matrix, material=Epoxy\n,\n")
+        file.write("*Material, name=Carbon_Fiber\n*Conductivity\n0.005\n")
+        file.write("*Density\n1.8e-09\n*Specific Heat\n7.1e+08\n")
+        file.write("*Material, name=Epoxy\n*Conductivity\n0.0002\n*Density\n1.2e-09\n")
+        file.write(
+            "*Step, name=Step-1\n*Heat Transfer, steady state\n1., 1.\n*End Step\n"
+        )
+
+
+def best_time(function: Callable[[], object], repeat: int = 3) -> float:
+    times: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_keyword_scan(file_path: str, repeat: int = 3) -> dict[str, float]:
+    """Compare the line by line keyword scan with the mmap keyword scan
+
+    Returns:
+        dict[str, float]: best time in seconds for each scan method
+    """
+    lines_entries, lines_hash = ki.scan_keywords(file_path, method="lines")
+    mmap_entries, mmap_hash = ki.scan_keywords(file_path, method="mmap")
+    if lines_entries != mmap_entries or lines_hash != mmap_hash:
+        raise RuntimeError("Scan methods disagree on the keyword index")
+
+    results = {
+        method: best_time(lambda: ki.scan_keywords(file_path, method), repeat)
+        for method in ("lines", "mmap")
+    }
+    logger.info(
+        f"Keyword scan of {os.path.getsize(file_path) / 1e6:.1f} MB: "
+        f"lines {results['lines']:.3f} s, mmap {results['mmap']:.3f} s, "
+        f"speedup {results['lines'] / results['mmap']:.1f}x"
+    )
+    return results
+
+
+def benchmark_binary_cache(file_path: str) -> dict[str, float]:
+    """Time opening the model without the binary cache (cold) and from it (warm)
+
+    Returns:
+        dict[str, float]: time in seconds of the cold and warm open
+    """
+    shutil.rmtree(cache_path(file_path), ignore_errors=True)
+    path, filename = os.path.split(file_path)
+    results: dict[str, float] = {}
+    for run in ("cold", "warm"):
+        start = time.perf_counter()
+        reader = AbaqusInputFile(filename, path)
+        reader.open_binary_cache()
+        reader.load_nodes()
+        reader.load_elements()
+        results[run] = time.perf_counter() - start
+        reader.close()
+
+    logger.info(
+        f"Binary cache of {os.path.getsize(file_path) / 1e6:.1f} MB: "
+        f"cold {results['cold']:.3f} s, warm {results['warm']:.3f} s"
+    )
+    return results
+
+
+def benchmark_parallel_parse(
+    file_path: str, workers: list[int] | None = None
+) -> dict[int, float]:
+    """Time parsing the nodes and elements with an increasing number of processes
+
+    Args:
+        file_path (str): path of the input file
+        workers (list[int] | None, optional): process counts to compare. Defaults to
+            1, 2, 4, ... up to the number of CPUs.
+
+    Returns:
+        dict[int, float]: time in seconds for each number of workers
+    """
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = [
+            1 << power for power in range(cpus.bit_length()) if 1 << power <= cpus
+        ]
+    path, filename = os.path.split(file_path)
+    results: dict[int, float] = {}
+    for count in workers:
+        reader = AbaqusInputFile(filename, path)
+        reader.index_keywords()
+        start = time.perf_counter()
+        reader.load_nodes(workers=count)
+        reader.load_elements(workers=count)
+        results[count] = time.perf_counter() - start
+        reader.close()
+
+    logger.info(
+        "Parallel parse: "
+        + ", ".join(
+            f"{count} workers {seconds:.3f} s" for count, seconds in results.items()
+        )
+    )
+    return results
+
+
+def benchmark_compression(file_path: str) -> dict[str, dict[str, float]]:
+    """Compare plain, gzip, block gzip and (if installed) Zstandard copies of the input:
+    file size, compression time, keyword indexing, loading the mesh and an unedited
+    ranges copy, which needs random access to the block of each keyword
+
+    Returns:
+        dict[str, dict[str, float]]: measurements of each compression
+    """
+    compressions: list[compressed_io.compression_types | None] = [None, "gzip", "bgzf"]
+    if compressed_io.zstandard is not None:
+        compressions.append("zstd")
+    path, filename = os.path.split(file_path)
+    stem = os.path.splitext(filename)[0]
+    results: dict[str, dict[str, float]] = {}
+    for compression in compressions:
+        name = compression or "plain"
+        suffix = compressed_io.suffixes[compression] if compression else ""
+        copy_name = f"{stem}-{name}.inp{suffix}"
+        copy_path = os.path.join(path, copy_name)
+        result: dict[str, float] = {}
+
+        start = time.perf_counter()
+        compressed_io.compress_file(file_path, copy_path, compression)
+        result["write"] = time.perf_counter() - start
+        result["size"] = os.path.getsize(copy_path) / 1e6
+
+        result["index"] = best_time(
+            lambda: ki.build_index(copy_path, use_sidecar=False), repeat=1
+        )
+
+        reader = AbaqusInputFile(copy_name, path)
+        reader.index_keywords()
+        start = time.perf_counter()
+        reader.load_nodes()
+        reader.load_elements()
+        result["load"] = time.perf_counter() - start
+        reader.close()
+
+        writer = modify_file(
+            path,
+            [],
+            output_filename=f"{stem}-{name}-copy",
+            input_path=path,
+            input_filename=copy_name,
+            compression=compression,
+        )
+        start = time.perf_counter()
+        writer.copy_and_edit(mode="ranges")
+        result["copy"] = time.perf_counter() - start
+        results[name] = result
+
+    logger.info(
+        "Compression: "
+        + ", ".join(
+            f"{name} {result['size']:.1f} MB (write {result['write']:.2f} s, "
+            f"index {result['index']:.2f} s, load {result['load']:.2f} s, "
+            f"copy {result['copy']:.2f} s)"
+            for name, result in results.items()
+        )
+    )
+    return results
+
+
+def benchmark_pipeline(
+    file_path: str, output_path: str | None = None
+) -> dict[str, float]:
+    """Time the line by line copy against the pipelined copy, with every fiber edited.
+    Point output_path at a network filesystem to see the effect of I/O latency.
+
+    Returns:
+        dict[str, float]: time in seconds of each copy mode
+    """
+    path, filename = os.path.split(file_path)
+    output_path = output_path or path
+    stem = os.path.splitext(filename)[0]
+    num_fibers = sum(
+        entry["name"].startswith("Fiber_")
+        for entry in ki.build_index(file_path)["entries"]
+    )
+    orientations = np.random.default_rng(0).random((num_fibers, 2)) * np.pi
+    results: dict[str, float] = {}
+    for mode in ("lines", "pipeline"):
+        writer = modify_file(
+            output_path,
+            [add_orientation("Fiber", orientations)],
+            output_filename=f"{stem}-{mode}",
+            input_path=path,
+            input_filename=filename,
+        )
+        start = time.perf_counter()
+        writer.copy_and_edit(mode=mode)  # type: ignore
+        results[mode] = time.perf_counter() - start
+
+    logger.info(
+        f"Edited copy of {os.path.getsize(file_path) / 1e6:.1f} MB: "
+        f"lines {results['lines']:.3f} s, pipeline {results['pipeline']:.3f} s"
+    )
+    return results
+
+
+def benchmark_orientation_lines(num_fibers: int = 10_000) -> float:
+    """Time rendering the *Orientation and *Solid Section lines of every fiber
+
+    Returns:
+        float: best time in seconds
+    """
+    orientations = np.random.default_rng(0).random((num_fibers, 2)) * np.pi
+    line = ["*Solid Section, elset=Fiber, material=Carbon_Fiber\n"]
+    seconds = best_time(
+        lambda: "".join(add_orientation("Fiber", orientations).stream_line(line)[0])
+    )
+    logger.info(f"Orientation lines of {num_fibers} fibers: {seconds:.3f} s")
+    return seconds
+
+
+def benchmark_orientation_modes(file_path: str) -> dict[str, dict[str, float]]:
+    """Compare one *Orientation and *Solid Section per fiber with one element wise
+    *Distribution for the whole fiber phase: time to write the edited copy (the
+    element to fiber mapping included), its size and its number of keywords
+
+    Returns:
+        dict[str, dict[str, float]]: measurements of each output mode
+    """
+    path, filename = os.path.split(file_path)
+    stem = os.path.splitext(filename)[0]
+    num_fibers = sum(
+        entry["name"].startswith("Fiber_")
+        for entry in ki.build_index(file_path)["entries"]
+    )
+    orientations = np.random.default_rng(0).random((num_fibers, 2)) * np.pi
+    results: dict[str, dict[str, float]] = {}
+    for mode in ("sections", "distribution"):
+        start = time.perf_counter()
+        reader = AbaqusInputFile(filename, path)
+        reader.index_keywords()
+        fiber_elements = (
+            reader.get_instance_elements("Fiber") if mode == "distribution" else None
+        )
+        writer = modify_file(
+            path,
+            [
+                add_orientation(
+                    "Fiber",
+                    orientations,
+                    output_mode=mode,  # type: ignore
+                    fiber_elements=fiber_elements,
+                )
+            ],
+            output_filename=f"{stem}-{mode}",
+            input_path=path,
+            input_filename=filename,
+        )
+        output_file = writer.output_file.name
+        writer.copy_and_edit(mode="ranges")
+        reader.close()
+        seconds = time.perf_counter() - start
+        results[mode] = {
+            "time": seconds,
+            "size": os.path.getsize(output_file) / 1e6,
+            "keywords": len(ki.build_index(output_file, use_sidecar=False)["entries"]),
+        }
+
+    logger.info(
+        "Orientation output: "
+        + ", ".join(
+            f"{mode} {result['time']:.3f} s, {result['size']:.1f} MB, "
+            f"{result['keywords']} keywords"
+            for mode, result in results.items()
+        )
+    )
+    return results
+
+
+if __name__ == "__main__":
+    working_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    num_nodes = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    input_file = os.path.join(working_dir, "benchmark.inp")
+    if not os.path.exists(input_file):
+        write_synthetic_input(input_file, num_nodes=num_nodes)
+
+    benchmark_keyword_scan(input_file)
+    benchmark_binary_cache(input_file)
+    benchmark_parallel_parse(input_file)
+    benchmark_compression(input_file)
+    benchmark_pipeline(input_file)
+    benchmark_orientation_lines()
+    benchmark_orientation_modes(input_file)